@@ -0,0 +1,213 @@
+import os
+import csv
+import json
+import math
+import random
+import argparse
+from program import Puzzle, solve, run_jobs, get_output_name
+
+
+BENCHMARK_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'SlidingBlocks', 'benchmarks')
+# solvers whose solutions must all have the optimal length
+OPTIMAL_ALGORITHMS = ['BFS', 'BIBFS', 'FBFS', 'ASTAR', 'IDASTAR', 'PIDASTAR', 'SMASTAR']
+TABLE_HEADER = ['solver', 'instances', 'solved', 'not_optimal', 'mean_s', 'median_s', 'p95_s', 'max_s',
+                'expanded', 'nodes_per_second']
+
+
+# ## Instance generator
+
+# get the optimal depth of a state with IDA*
+def get_optimal_depth(state, h_flag = 0, shape = None):
+    leaf_node = solve(state, 'IDASTAR', h_flag, shape = shape)
+    return 0 if leaf_node == None else leaf_node.depth
+
+
+# generate `count` distinct dim*columns (dim*dim by default) instances whose optimal depth is in
+# [min_depth, max_depth] by seeded random walks of the blank space from the goal state; every instance
+# is solvable by construction. return [name, state, optimal depth] lists
+def generate_instances(dim, count, min_depth, max_depth, seed = 0, h_flag = 0, max_tries = 100000,
+                       columns = None):
+    rng = random.Random(seed)
+    shape = (dim, columns or dim)
+    puzzle = Puzzle(list(range(shape[0] * shape[1])), shape)
+    goal_state = puzzle.get_goal_state()
+    instances = []
+    seen = set()
+    for tries in range(max_tries):
+        if len(instances) == count:
+            break
+        state = list(goal_state)
+        blank = state.index(0)
+        prev_blank = None
+        for step in range(rng.randint(min_depth, 3 * max_depth)):  # a walk never undoes its last move
+            next_blank = rng.choice([cell for action, cell in puzzle.move_table[blank] if cell != prev_blank])
+            state[blank], state[next_blank] = state[next_blank], 0
+            prev_blank, blank = blank, next_blank
+        if tuple(state) in seen:
+            continue
+        seen.add(tuple(state))
+        depth = get_optimal_depth(state, h_flag, shape)
+        if min_depth <= depth <= max_depth:
+            instances.append([str(shape[0]) + 'x' + str(shape[1]) + '_' + str(len(instances) + 1), state, depth])
+    return instances
+
+
+# ## Benchmark
+
+# solve every instance with every [algorithm, h_flag] one job at a time, so that the timings are comparable;
+# return {solver name: [[instance name, steps, running time, expanded, search time] or None if not solved]}
+def run_benchmark(instances, solvers, timeout = 60, shape = None):
+    jobs = []
+    for algorithm, h_flag in solvers:
+        for name, state, depth in instances:
+            # count nodes without tracing memory
+            jobs.append([state, algorithm, h_flag, True, False, None, name, shape])
+    results = run_jobs(jobs, timeout, processes = 1)
+
+    runs = {}
+    for s, [algorithm, h_flag] in enumerate(solvers):
+        rows = []
+        for i, [name, state, depth] in enumerate(instances):
+            job_result = results[s * len(instances) + i]
+            if job_result == None or job_result[4] != None:  # timed out, or out of memory
+                rows.append(None)
+                continue
+            [actions, starting_time, ending_time, record, error] = job_result
+            rows.append([name, len(actions or []), (ending_time - starting_time).total_seconds(),
+                         record['expanded'], record['phases'].get('search', 0)])
+        runs[get_output_name(algorithm, h_flag)] = rows
+    return runs
+
+
+# summarize the runs into one row per solver in the order of TABLE_HEADER; an optimal solver
+# whose solution is longer or shorter than the optimal depth counts as not optimal
+def get_table(instances, runs):
+    table = []
+    for solver, rows in runs.items():
+        solved = [row for row in rows if row is not None]
+        times = sorted(row[2] for row in solved)
+        not_optimal = 0
+        if solver.split('_')[0] in OPTIMAL_ALGORITHMS:
+            not_optimal = sum(1 for row, [name, state, depth] in zip(rows, instances)
+                              if row is not None and row[1] != depth)
+        expanded = sum(row[3] for row in solved)
+        search_time = sum(row[4] for row in solved)
+        table.append([solver, len(rows), len(solved), not_optimal,
+                      round(sum(times) / len(times), 6) if times else None,
+                      round(times[len(times) // 2], 6) if times else None,
+                      round(times[max(0, math.ceil(0.95 * len(times)) - 1)], 6) if times else None,
+                      round(times[-1], 6) if times else None,
+                      expanded,
+                      round(expanded / search_time) if search_time and expanded else None])
+    return table
+
+
+def write_table(path, table):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(TABLE_HEADER)
+        writer.writerows(table)
+
+
+# ## Baseline
+
+def save_baseline(path, table, settings):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'settings': settings, 'table': [dict(zip(TABLE_HEADER, row)) for row in table]}, f, indent = 2)
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# compare a table with a baseline of the same settings; return a message for every solver whose median
+# latency is more than `tolerance` times the baseline, that solves fewer instances or that is not optimal
+def compare_baseline(table, baseline, tolerance = 1.25):
+    previous = {row['solver']: row for row in baseline['table']}
+    regressions = []
+    for row in table:
+        row = dict(zip(TABLE_HEADER, row))
+        solver = row['solver']
+        if row['not_optimal']:
+            regressions.append(solver + ': ' + str(row['not_optimal']) + ' solutions are not optimal')
+        if solver not in previous:
+            continue
+        base = previous[solver]
+        if row['solved'] < base['solved']:
+            regressions.append(solver + ': solved ' + str(row['solved']) + ' of ' + str(base['solved']))
+        if row['median_s'] and base['median_s'] and row['median_s'] > tolerance * base['median_s']:
+            regressions.append(solver + ': median ' + str(row['median_s']) + 's vs ' + str(base['median_s']) + 's')
+    return regressions
+
+
+if __name__ == '__main__':
+    # > python benchmark.py 3 --depth 18 24 --count 20 --solvers BFS ASTAR IDASTAR:3 --save-baseline
+    parser = argparse.ArgumentParser(description = 'Benchmark the sliding-tile solvers on random instances')
+    parser.add_argument("dim",
+                        type = int,
+                        help = "size of the puzzle, e.g. 3 for a 3 X 3 puzzle")
+    parser.add_argument("--columns",
+                        type = int,
+                        help = "columns of a rectangular puzzle, dim rows by default",
+                        default = None)
+    parser.add_argument("--depth",
+                        type = int,
+                        nargs = 2,
+                        help = "band of optimal depths of the instances",
+                        default = [16, 22])
+    parser.add_argument("--count",
+                        type = int,
+                        help = "number of instances",
+                        default = 20)
+    parser.add_argument("--seed",
+                        type = int,
+                        help = "seed of the random walks",
+                        default = 0)
+    parser.add_argument("--solvers",
+                        nargs = '+',
+                        help = "algorithm or algorithm:h_flag of each solver",
+                        default = ['BFS', 'BIBFS', 'ASTAR', 'ASTAR:2', 'IDASTAR'])
+    parser.add_argument("--timeout",
+                        type = int,
+                        help = "seconds before a run is killed",
+                        default = 60)
+    parser.add_argument("--tolerance",
+                        type = float,
+                        help = "allowed slowdown of the median latency against the baseline",
+                        default = 1.25)
+    parser.add_argument("--save-baseline",
+                        action = 'store_true',
+                        help = "save the table as the baseline of these settings")
+    args = parser.parse_args()
+
+    solvers = []
+    for solver in args.solvers:
+        algorithm, h_flag = (solver.split(':') + ['0'])[:2]
+        solvers.append([algorithm, int(h_flag)])
+    shape = (args.dim, args.columns or args.dim)
+    name = (str(shape[0]) + 'x' + str(shape[1]) + '_d' + str(args.depth[0]) + '-' + str(args.depth[1]) +
+            '_n' + str(args.count) + '_s' + str(args.seed))
+    if not os.path.exists(BENCHMARK_DIRECTORY):
+        os.makedirs(BENCHMARK_DIRECTORY)
+
+    instances = generate_instances(args.dim, args.count, args.depth[0], args.depth[1], args.seed,
+                                   columns = args.columns)
+    print('Generated ' + str(len(instances)) + ' instances')
+    table = get_table(instances, run_benchmark(instances, solvers, args.timeout, shape))
+    write_table(os.path.join(BENCHMARK_DIRECTORY, name + '.csv'), table)
+    print(' '.join(f"{column:>12}" for column in TABLE_HEADER))
+    for row in table:
+        print(' '.join(f"{str(value):>12}" for value in row))
+
+    baseline_path = os.path.join(BENCHMARK_DIRECTORY, name + '_baseline.json')
+    if args.save_baseline:
+        save_baseline(baseline_path, table, vars(args))
+        print('Saved the baseline ' + baseline_path)
+    elif os.path.exists(baseline_path):
+        regressions = compare_baseline(table, load_baseline(baseline_path), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if not regressions:
+            print('No regression against ' + baseline_path)
@@ -0,0 +1,114 @@
+import random
+import argparse
+from heapq import heappush, heappop
+from queue import PriorityQueue
+from datetime import datetime
+
+
+class BucketOpenList(object):
+    # open list for integer f-values: buckets[f][g] is a stack of (key, item) entries, so popping takes
+    # the smallest f, breaks ties by the largest g and is LIFO inside a bucket. a key pushed again with a
+    # smaller g replaces its old entry, which stays in its bucket and is skipped when popped (lazy deletion)
+    def __init__(self):
+        self.buckets = []
+        self.min_f = 0  # no entry has a smaller f
+        self.open_g = {}  # key -> g of its live entry
+        self.size = 0  # number of live entries
+        self.pushes = 0  # number of accepted pushes
+
+    def __len__(self):
+        return self.size
+
+    def empty(self):
+        return self.size == 0
+
+    # get the g of the live entry of the key, or None if it is not in the open list
+    def get_g(self, key):
+        return self.open_g.get(key)
+
+    # push an item with f = g + h; return False and ignore it if the key is already open with g or less
+    def push(self, key, item, f, g):
+        open_g = self.open_g.get(key)
+        if open_g is not None and open_g <= g:
+            return False
+        if open_g is None:
+            self.size += 1
+        self.open_g[key] = g
+        self.pushes += 1
+
+        while len(self.buckets) <= f:
+            self.buckets.append([])
+        bucket = self.buckets[f]
+        while len(bucket) <= g:
+            bucket.append([])
+        bucket[g].append((key, item))
+        if f < self.min_f:
+            self.min_f = f
+        return True
+
+    # pop the live entry with the smallest f and the largest g; return [item, f, g]
+    def pop(self):
+        while self.size:
+            bucket = self.buckets[self.min_f]
+            while bucket and not bucket[-1]:  # drop the empty stacks of the largest g
+                bucket.pop()
+            if not bucket:
+                self.min_f += 1
+                continue
+            g = len(bucket) - 1
+            key, item = bucket[g].pop()
+            if self.open_g.get(key) != g:
+                continue  # replaced by a cheaper entry
+            del self.open_g[key]
+            self.size -= 1
+            return [item, self.min_f, g]
+        raise IndexError('pop from an empty open list')
+
+
+# ## Micro-benchmark
+
+# push and pop n items with the f-values and g-values of a typical A* run
+def benchmark_open_list(n = 200000, seed = 0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n):
+        g = rng.randint(0, 40)
+        entries.append([i, g + rng.randint(0, 20), g])
+
+    results = []
+    starting_time = datetime.now()
+    tree = BucketOpenList()
+    for key, f, g in entries:
+        tree.push(key, key, f, g)
+    while tree:
+        tree.pop()
+    results.append(['BucketOpenList', (datetime.now() - starting_time).total_seconds()])
+
+    starting_time = datetime.now()
+    heap = []
+    for key, f, g in entries:
+        heappush(heap, (f, -g, key))
+    while heap:
+        heappop(heap)
+    results.append(['heapq', (datetime.now() - starting_time).total_seconds()])
+
+    starting_time = datetime.now()
+    tree = PriorityQueue()
+    for key, f, g in entries:
+        tree.put((f, -g, key))
+    while not tree.empty():
+        tree.get()
+    results.append(['queue.PriorityQueue', (datetime.now() - starting_time).total_seconds()])
+    return results
+
+
+if __name__ == '__main__':
+    # > python open_list.py -n 200000
+    parser = argparse.ArgumentParser(description = 'Micro-benchmark of the A* open lists')
+    parser.add_argument("-n",
+                        type = int,
+                        help = "number of pushed items",
+                        default = 200000)
+    args = parser.parse_args()
+    for name, running_time in benchmark_open_list(args.n):
+        print(f"{name:<20} {running_time:.3f}s  {args.n / running_time:,.0f} push+pop/s")
@@ -0,0 +1,254 @@
+import os
+import mmap
+import struct
+import argparse
+from collections import deque
+
+
+# file header: magic, number of cells, number of pattern tiles, then the pattern tiles
+PDB_MAGIC = b'PDB1'
+PDB_HEADER = '<4sBB'
+PDB_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'SlidingBlocks', 'pattern_databases')
+UNVISITED = 255
+
+# disjoint tile groups for the goal state [0,1,...,n-1]; each group is one table
+DEFAULT_PATTERNS = {
+    3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+    4: [(1, 2, 3, 6, 7), (4, 5, 8, 9, 12), (10, 11, 13, 14, 15)],
+}
+
+
+# get the disjoint patterns of a dim*dim puzzle; larger boards use groups of 4 tiles
+def get_default_patterns(dim):
+    if dim in DEFAULT_PATTERNS:
+        return DEFAULT_PATTERNS[dim]
+    tiles = list(range(1, dim * dim))
+    return [tuple(tiles[i:i + 4]) for i in range(0, len(tiles), 4)]
+
+
+# get the number of entries of a table, i.e. the ways to place k pattern tiles on n cells
+def get_table_size(n, k):
+    size = 1
+    for i in range(k):
+        size *= n - i
+    return size
+
+
+# rank the cells of the pattern tiles into [0, n*(n-1)*...*(n-k+1))
+def rank_positions(positions, n):
+    index = 0
+    for i, cell in enumerate(positions):
+        smaller = 0
+        for j in range(i):
+            if positions[j] < cell:
+                smaller += 1
+        index = index * (n - i) + cell - smaller
+    return index
+
+
+# get the neighbour cells of every cell in a dim*dim puzzle
+def get_neighbours(dim):
+    neighbours = []
+    for cell in range(dim * dim):
+        row, column = divmod(cell, dim)
+        cells = []
+        if row > 0:
+            cells.append(cell - dim)
+        if column > 0:
+            cells.append(cell - 1)
+        if column < dim - 1:
+            cells.append(cell + 1)
+        if row < dim - 1:
+            cells.append(cell + dim)
+        neighbours.append(tuple(cells))
+    return tuple(neighbours)
+
+
+# build the table of one pattern by a backward 0-1 BFS from the goal state:
+# moving a pattern tile costs 1, moving any other tile costs 0, so the entries
+# of disjoint patterns can be added and the sum stays admissible
+def build_pattern_table(dim, pattern):
+    n = dim * dim
+    k = len(pattern)
+    neighbours = get_neighbours(dim)
+    size = get_table_size(n, k)
+    table = bytearray([UNVISITED]) * size
+    # distance of every (pattern positions, blank cell) abstract state
+    distance = bytearray([UNVISITED]) * (size * n)
+
+    # an abstract state is packed into one int: 8 bits per pattern tile position, then the blank
+    blank_shift = 8 * k
+    goal_positions = list(pattern)
+    goal = sum(cell << (8 * i) for i, cell in enumerate(goal_positions)) | (0 << blank_shift)
+    distance[rank_positions(goal_positions, n) * n] = 0
+    tree = deque([(goal, 0)])
+
+    while tree:
+        code, cost = tree.popleft()
+        positions = [(code >> (8 * i)) & 0xff for i in range(k)]
+        blank = code >> blank_shift
+        index = rank_positions(positions, n)
+        if cost > distance[index * n + blank]:
+            continue  # a cheaper copy of this state was expanded already
+        if cost < table[index]:
+            table[index] = cost
+
+        for next_blank in neighbours[blank]:
+            if next_blank in positions:  # a pattern tile slides into the blank cell
+                i = positions.index(next_blank)
+                positions[i] = blank
+                next_index = rank_positions(positions, n)
+                next_code = code + ((blank - next_blank) << (8 * i))
+                positions[i] = next_blank
+                next_cost = cost + 1
+            else:
+                next_index = index
+                next_code = code
+                next_cost = cost
+            next_code = (next_code & ((1 << blank_shift) - 1)) | (next_blank << blank_shift)
+            state_index = next_index * n + next_blank
+            if next_cost < distance[state_index]:
+                distance[state_index] = next_cost
+                if next_cost == cost:
+                    tree.appendleft((next_code, next_cost))
+                else:
+                    tree.append((next_code, next_cost))
+    return table
+
+
+# get the file name of the table of a pattern, e.g. 4x4_1-2-3-6-7.pdb
+def get_table_path(dim, pattern, directory = PDB_DIRECTORY):
+    name = str(dim) + 'x' + str(dim) + '_' + '-'.join(str(tile) for tile in pattern) + '.pdb'
+    return os.path.join(directory, name)
+
+
+# write the table next to its path and move it into place, so that another process never maps a partly
+# written file; the temporary name is per process in case several of them build the same table
+def save_pattern_table(path, dim, pattern, table):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+    tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack(PDB_HEADER, PDB_MAGIC, dim * dim, len(pattern)))
+        f.write(bytes(pattern))
+        f.write(table)
+    os.replace(tmp_path, path)
+
+
+# memory-map a saved table; return the pattern, the offset of the first entry and the map
+def load_pattern_table(path):
+    with open(path, 'rb') as f:
+        table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n, k = struct.unpack_from(PDB_HEADER, table)
+    if magic != PDB_MAGIC:
+        raise ValueError('Not a pattern database file: ' + path)
+    offset = struct.calcsize(PDB_HEADER)
+    pattern = tuple(table[offset:offset + k])
+    offset += k
+    if len(table) - offset != get_table_size(n, k):
+        raise ValueError('Truncated pattern database file: ' + path)
+    return pattern, offset, table
+
+
+class PatternDatabase(object):
+    # additive disjoint pattern database for a dim*dim puzzle;
+    # missing tables are built and saved once, later runs only memory-map them
+    def __init__(self, dim, patterns = None, directory = PDB_DIRECTORY):
+        self.dim = dim
+        self.n = dim * dim
+        self.patterns = [tuple(pattern) for pattern in (patterns or get_default_patterns(dim))]
+        self.tables = []
+        self.offsets = []
+        self.tile_pattern = [None] * self.n  # the index of the pattern of each tile
+        self.tile_order = [None] * self.n  # the index of each tile in its pattern
+        for p, pattern in enumerate(self.patterns):
+            path = get_table_path(dim, pattern, directory)
+            if not os.path.exists(path):
+                save_pattern_table(path, dim, pattern, build_pattern_table(dim, pattern))
+            loaded_pattern, offset, table = load_pattern_table(path)
+            if loaded_pattern != pattern:
+                raise ValueError('Pattern mismatch in ' + path)
+            self.tables.append(table)
+            self.offsets.append(offset)
+            for i, tile in enumerate(pattern):
+                self.tile_pattern[tile] = p
+                self.tile_order[tile] = i
+
+    # get the table entry of pattern p given the cell of every tile
+    def pattern_value(self, p, tile_positions):
+        positions = [tile_positions[tile] for tile in self.patterns[p]]
+        return self.tables[p][self.offsets[p] + rank_positions(positions, self.n)]
+
+    # get the heuristic value of a state(list data type)
+    def h_value(self, state):
+        tile_positions = [0] * self.n
+        for cell, tile in enumerate(state):
+            tile_positions[tile] = cell
+        return sum(self.pattern_value(p, tile_positions) for p in range(len(self.patterns)))
+
+    # get the heuristic value after the tile moves to next_cell; only the table of
+    # its own pattern changes. tile_positions is restored before returning
+    def get_next_h(self, h_value, tile_positions, tile, next_cell):
+        p = self.tile_pattern[tile]
+        if p is None:
+            return h_value
+        cell = tile_positions[tile]
+        old_value = self.pattern_value(p, tile_positions)
+        tile_positions[tile] = next_cell
+        new_value = self.pattern_value(p, tile_positions)
+        tile_positions[tile] = cell
+        return h_value - old_value + new_value
+
+    # get_next_h for a state packed into an integer, tile_bits bits per cell, where the tile moves from
+    # cell to next_cell; only the cells of the tiles of its pattern are read from the code
+    def get_packed_next_h(self, h_value, code, tile_bits, tile, cell, next_cell):
+        p = self.tile_pattern[tile]
+        if p is None:
+            return h_value
+        tile_pattern = self.tile_pattern
+        tile_order = self.tile_order
+        mask = (1 << tile_bits) - 1
+        left = len(self.patterns[p])
+        positions = [0] * left
+        position = 0
+        while left:
+            other = code & mask
+            if tile_pattern[other] == p:
+                positions[tile_order[other]] = position
+                left -= 1
+            code >>= tile_bits
+            position += 1
+        table = self.tables[p]
+        offset = self.offsets[p]
+        old_value = table[offset + rank_positions(positions, self.n)]
+        positions[tile_order[tile]] = next_cell
+        return h_value - old_value + table[offset + rank_positions(positions, self.n)]
+
+
+# keep one loaded database per board size in each process
+pattern_databases = {}
+
+
+def get_pattern_database(dim):
+    if dim not in pattern_databases:
+        pattern_databases[dim] = PatternDatabase(dim)
+    return pattern_databases[dim]
+
+
+if __name__ == '__main__':
+    # build the tables ahead of time
+    # > python pattern_database.py 4
+    parser = argparse.ArgumentParser(description = 'Build additive pattern databases')
+    parser.add_argument("dim",
+                        type = int,
+                        help = "size of the puzzle, e.g. 4 for a 4 X 4 puzzle")
+    args = parser.parse_args()
+    for pattern in get_default_patterns(args.dim):
+        path = get_table_path(args.dim, pattern)
+        if os.path.exists(path):
+            print('Found ' + path)
+            continue
+        print('Building ' + path)
+        save_pattern_table(path, args.dim, pattern, build_pattern_table(args.dim, pattern))
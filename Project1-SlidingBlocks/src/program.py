@@ -4,55 +4,208 @@
 # In[2]:
 
 
-import numpy as np
-import pandas as pd
 import os
-import re
-from math import sqrt
+import sys
+import csv
+import json
+import glob
+import signal
+import multiprocessing
+from multiprocessing.connection import wait
+from fractions import Fraction
+from heapq import heappush, heappop
 from collections import deque
-from queue import PriorityQueue
-from datetime import datetime
+from datetime import datetime, timedelta
+from pattern_database import get_pattern_database
+from open_list import BucketOpenList
+from search_stats import SearchStats, write_stats
+from solution_cache import SolutionCache
 
 
 # In[3]:
 
 
+class Board(object):
+    # the geometry of a rows*columns board, built once per shape and shared by every Puzzle of that shape:
+    # the (row, column) of each cell, the valid actions and (action, next blank index) moves of each blank
+    # index, and the heuristic tables of each goal state
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.size = rows * columns
+        self.coordinates = tuple(divmod(cell, columns) for cell in range(self.size))
+        self.actions_offset = {'UP': -columns, 'LEFT': -1, 'RIGHT': 1, 'DOWN': columns}
+        self.cell_actions = self.get_cell_actions()
+        self.move_table = tuple(tuple((action, cell + self.actions_offset[action]) for action in actions)
+                                for cell, actions in enumerate(self.cell_actions))
+        self.direction_table = tuple(tuple((ACTIONS.index(action), next_blank) for action, next_blank in moves)
+                                     for moves in self.move_table)
+        self.goal_tables = {}  # goal state -> GoalTables
+
+    # get the valid actions of every blank index, in the order of ACTIONS
+    def get_cell_actions(self):
+        cell_actions = []
+        for row, column in self.coordinates:
+            actions = []
+            if row > 0:
+                actions.append('UP')
+            if column > 0:
+                actions.append('LEFT')
+            if column < self.columns - 1:
+                actions.append('RIGHT')
+            if row < self.rows - 1:
+                actions.append('DOWN')
+            cell_actions.append(tuple(actions))
+        return tuple(cell_actions)
+
+    def get_goal_tables(self, goal_state):
+        goal_state = tuple(goal_state)
+        if goal_state not in self.goal_tables:
+            self.goal_tables[goal_state] = GoalTables(self, goal_state)
+        return self.goal_tables[goal_state]
+
+
+class GoalTables(object):
+    # lookup tables of a goal state on a board: the goal cell and the goal rank (the order among
+    # the tiles, the blank space excluded) of every tile, and the per-tile, per-cell heuristic tables
+    def __init__(self, board, goal_state):
+        self.goal_state = goal_state
+        self.goal_positions = [0] * board.size
+        for cell, tile in enumerate(goal_state):
+            self.goal_positions[tile] = cell
+        self.goal_ranks = [0] * board.size
+        for rank, tile in enumerate(tile for tile in goal_state if tile != 0):
+            self.goal_ranks[tile] = rank
+        # manhattan_table[tile][cell]: the manhattan distance between the cell and the goal cell of the tile
+        self.manhattan_table = []
+        for tile in range(board.size):
+            if tile == 0:
+                self.manhattan_table.append((0,) * board.size)  # the blank space is not counted
+                continue
+            row_goal, column_goal = board.coordinates[self.goal_positions[tile]]
+            self.manhattan_table.append(tuple(abs(row - row_goal) + abs(column - column_goal)
+                                              for row, column in board.coordinates))
+        self.manhattan_table = tuple(self.manhattan_table)
+        # misplaced_table[tile][cell]: 1 if the tile is not in its goal cell, 0 otherwise
+        self.misplaced_table = tuple(tuple(int(tile != 0 and self.goal_positions[tile] != cell)
+                                           for cell in range(board.size))
+                                     for tile in range(board.size))
+
+
+# keep one Board per shape in each process
+boards = {}
+
+
+def get_board(rows, columns):
+    if (rows, columns) not in boards:
+        boards[(rows, columns)] = Board(rows, columns)
+    return boards[(rows, columns)]
+
+
+# get the (rows, columns) of a square board of n cells
+def get_square_shape(n):
+    dim = 1
+    while dim * dim < n:
+        dim += 1
+    if dim * dim != n:
+        raise ValueError('A state of ' + str(n) + ' tiles needs the rows and columns of its board')
+    return (dim, dim)
+
+
+PATTERN_DATABASE_ERROR = 'The pattern database (h_flag 3) needs a square board and the goal state [0,1,...,n-1]'
+
+
 class Puzzle(object):
-    # puzzle constructor
-    def __init__(self, init_state):
+    # puzzle constructor; the board is square unless its shape (rows, columns) is given,
+    # and the goal state is [0,1,...,n-1] unless goal_state is given
+    def __init__(self, init_state, shape = None, goal_state = None):
         self.init_state = init_state
-        self.action_fences = self.get_action_fences()
+        self.rows, self.columns = shape or get_square_shape(len(init_state))
+        if self.rows * self.columns != len(init_state):
+            raise ValueError('A ' + str(self.rows) + ' X ' + str(self.columns) + ' board has ' +
+                             str(self.rows * self.columns) + ' tiles, not ' + str(len(init_state)))
+        self.goal_state = list(range(len(init_state))) if goal_state is None else list(goal_state)
+        if sorted(self.goal_state) != list(range(len(init_state))):
+            raise ValueError('The goal state must hold the tiles 0 to ' + str(len(init_state) - 1))
+        self.board = get_board(self.rows, self.columns)
+        self.move_table = self.board.move_table
+        self.direction_table = self.board.direction_table
+        # packed-integer encoding: tile_bits bits per cell (4 bits for boards up to 4*4)
+        self.tile_bits = max(4, (len(init_state) - 1).bit_length())
+        self.tile_mask = (1 << self.tile_bits) - 1
+        self.init_code = self.pack_state(init_state)
+        self.init_blank = self.find_blank_space(init_state)
+        self.goal_code = self.pack_state(self.goal_state)
+        goal_tables = self.board.get_goal_tables(self.goal_state)
+        self.goal_positions = goal_tables.goal_positions
+        self.goal_ranks = goal_tables.goal_ranks
+        # per-tile, per-cell heuristic tables: h_tables[flag][tile][cell]
+        self.h_tables = {0: goal_tables.manhattan_table, 2: goal_tables.misplaced_table}
+        self.pattern_database = None  # loaded on first use of h_flag 3
 
     # rewrite len()
     def __len__(self):
         return len(self.init_state)
 
-    # get the action fences, filtering actions based on the location of the blank space
-    def get_action_fences(self):
-        length = len(self)
-        dim = int(sqrt(length))
-        up_fence = tuple(i for i in range(0, dim))
-        left_fence = tuple(i for i in range(0, length, dim))
-        right_fence = tuple(i for i in range(dim - 1, length, dim))
-        down_fence = tuple(i for i in range(length - dim, length))
-        action_fences = {
-            'UP': up_fence,
-            'LEFT': left_fence,
-            'RIGHT': right_fence,
-            'DOWN': down_fence
-        }
-        return action_fences
-
-    # get the goal state; e.g. for a 3*3 puzzle, the goal state is [0,1,2,3,4,5,6,7,8]
+    # pack a state(list data type) into one integer, cell i takes bits [i*tile_bits, (i+1)*tile_bits)
+    def pack_state(self, state):
+        code = 0
+        for i, tile in enumerate(state):
+            code |= tile << (i * self.tile_bits)
+        return code
+
+    # unpack an integer state back into a list
+    def unpack_state(self, code):
+        return [(code >> (i * self.tile_bits)) & self.tile_mask for i in range(len(self))]
+
+    # get the packed state after moving the blank space from blank_index to next_blank_index;
+    # the blank is 0, so swapping is removing the tile from its cell and adding it to the blank cell
+    def get_next_code(self, code, blank_index, next_blank_index):
+        shift = next_blank_index * self.tile_bits
+        tile = (code >> shift) & self.tile_mask
+        return code - (tile << shift) + (tile << (blank_index * self.tile_bits))
+
+    # check whether the pattern database (h_flag 3) applies: its tables are built for square boards
+    # with the goal state [0,1,...,n-1]
+    def has_pattern_database(self):
+        return self.rows == self.columns and self.goal_state == list(range(len(self)))
+
+    # get the additive pattern database of the board size, built or memory-mapped once per process
+    def get_pattern_database(self):
+        if self.pattern_database is None:
+            if not self.has_pattern_database():
+                raise ValueError(PATTERN_DATABASE_ERROR)
+            self.pattern_database = get_pattern_database(self.rows)
+        return self.pattern_database
+
+    # get the goal state; by default, e.g. for a 3*3 puzzle, the goal state is [0,1,2,3,4,5,6,7,8]
     def get_goal_state(self):
-        return [0] + [i for i in range(1, len(self.init_state))]
+        return list(self.goal_state)
+
+    # check in O(n) whether the goal state is reachable: every move swaps the blank with a neighbour, so the
+    # parity of the permutation between the state and the goal state must equal the parity of the
+    # manhattan distance between the blank space and its goal cell
+    def is_solvable(self, state = None):
+        state = self.init_state if state is None else state
+        goal_index = self.goal_positions
+        visited = [False] * len(state)
+        cycles = 0
+        for cell in range(len(state)):
+            if not visited[cell]:
+                cycles += 1
+                while not visited[cell]:
+                    visited[cell] = True
+                    cell = goal_index[state[cell]]
+        permutation_parity = (len(state) - cycles) % 2
+        blank_row, blank_column = self.board.coordinates[self.find_blank_space(state)]
+        goal_row, goal_column = self.board.coordinates[goal_index[0]]
+        blank_distance = abs(blank_row - goal_row) + abs(blank_column - goal_column)
+        return permutation_parity == blank_distance % 2
 
     # get the state(list data type) after changing the blank space
     def get_next_state(self, state, action):
-        dim = int(sqrt(len(state)))
-        actions_offset = {'UP': -dim, 'LEFT': -1, 'RIGHT': 1, 'DOWN': dim}
         blank_index = self.find_blank_space(state)
-        next_blank_index = blank_index + actions_offset[action]
+        next_blank_index = blank_index + self.board.actions_offset[action]
         next_state = list(state)
         next_state[blank_index], next_state[next_blank_index] = next_state[
             next_blank_index], next_state[blank_index]
@@ -64,51 +217,57 @@ class Puzzle(object):
 
     # get valid actions based on the location of the blank space in the puzzle
     def filter_actions(self, state):
-        filtered_actions = []
-        blank_index = self.find_blank_space(state)
-        for action, fence in self.action_fences.items():
-            if blank_index not in fence:
-                filtered_actions.append(action)
-        return filtered_actions
+        return list(self.board.cell_actions[self.find_blank_space(state)])
 
     # heuristic function
     def h_value(self, state, flag = 0):        
         h_value = 0
         
-        if flag == 0:
-            dim = int(sqrt(len(state)))
+        if flag in self.h_tables:  # 0: manhattan distance, 2: misplaced tiles
+            h_table = self.h_tables[flag]
             for i in range(len(state)):
-                if (state[i] != 0):
-                    row = int(i//dim)
-                    column = int(i%dim)
-                    row_goal = int(state[i]//dim)
-                    column_goal = int(state[i]%dim)
-                    h_value += abs(row - row_goal) + abs(column - column_goal)
-        elif flag == 1:
+                h_value += h_table[state[i]][i]
+        elif flag == 1:  # inversions against the order of the tiles in the goal state
+            goal_ranks = self.goal_ranks
             for i in range(len(state)):
                 if (state[i] != 0):
                     for j in range(i):
-                        if (state[j] > state[i]):
+                        if (state[j] != 0 and goal_ranks[state[j]] > goal_ranks[state[i]]):
                             h_value += 1
-        elif flag == 2:
-            for i in range(len(state)):
-                if (state[i] != 0) and (state[i] != i): h_value += 1
+        elif flag == 3:  # additive disjoint pattern database
+            h_value = self.get_pattern_database().h_value(state)
         else:
             pass
         
         return h_value
 
+    # get the heuristic value of the child incrementally from the parent's h_value:
+    # only the tile moving from next_blank_index to blank_index changes the sum
+    def get_next_h(self, h_value, code, blank_index, next_blank_index, flag = 0):
+        tile = (code >> (next_blank_index * self.tile_bits)) & self.tile_mask
+        if flag == 3:  # only the table of the moved tile's pattern changes
+            return self.get_pattern_database().get_packed_next_h(h_value, code, self.tile_bits, tile,
+                                                                 next_blank_index, blank_index)
+        if flag not in self.h_tables:  # inversion count is not additive over tiles
+            next_code = self.get_next_code(code, blank_index, next_blank_index)
+            return self.h_value(self.unpack_state(next_code), flag)
+        h_row = self.h_tables[flag][tile]
+        return h_value - h_row[next_blank_index] + h_row[blank_index]
+
 
 # In[4]:
 
 
 class Node(object):
-    # Node constructor
-    def __init__(self, state, parent=None, action=None, depth=0):
+    # Node constructor; state is the packed integer state, blank the index of the blank space
+    # and h the heuristic value of the state
+    def __init__(self, state, parent=None, action=None, depth=0, blank=None, h=0):
         self.state = state
         self.parent = parent
         self.action = action
         self.depth = depth
+        self.blank = blank
+        self.h = h
 
     def __lt__(self, node):
         if self.depth <= node.depth:
@@ -116,10 +275,10 @@ class Node(object):
         return False
 
     def __hash__(self):
-        return hash(tuple(self.state))
+        return hash(self.state)
 
-    def get_next_node(self, state, action, depth):
-        return Node(state, self, action, depth)
+    def get_next_node(self, state, action, depth, blank=None, h=0):
+        return Node(state, self, action, depth, blank, h)
 
     def get_path(self):
         node = self
@@ -143,26 +302,148 @@ class Node(object):
 # In[5]:
 
 
-def bfs(Puzzle):
-    init_node = Node(Puzzle.init_state)
-    goal_state = Puzzle.get_goal_state()
-    if (Puzzle.init_state == goal_state):
+def bfs(Puzzle, stats = None):
+    init_node = Node(Puzzle.init_code, blank=Puzzle.init_blank)
+    goal_code = Puzzle.goal_code
+    if (Puzzle.init_code == goal_code):
         return None
-    state_record = set(tuple(Puzzle.init_state))
+    state_record = {Puzzle.init_code}
     tree = deque([init_node])
 
     while tree:
+        if stats is not None:
+            stats.update_open(len(tree))
         node = tree.popleft()
-        state = node.state
-        valid_actions = Puzzle.filter_actions(state)
-        for action in valid_actions:
-            next_state = Puzzle.get_next_state(state, action)
-            if (next_state == goal_state):
-                return node.get_next_node(next_state, action, node.depth + 1)
-            elif tuple(next_state) not in state_record:
+        code = node.state
+        for action, next_blank in Puzzle.move_table[node.blank]:
+            next_code = Puzzle.get_next_code(code, node.blank, next_blank)
+            if (next_code == goal_code):
+                if stats is not None:  # count the successors generated before the goal
+                    stats.expanded += 1
+                    stats.generated += Puzzle.move_table[node.blank].index((action, next_blank)) + 1
+                    set_closed_stats(stats, len(state_record), len(state_record))
+                return node.get_next_node(next_code, action, node.depth + 1, next_blank)
+            elif next_code not in state_record:
                 tree.append(
-                    node.get_next_node(next_state, action, node.depth + 1))
-                state_record.add(tuple(next_state))
+                    node.get_next_node(next_code, action, node.depth + 1, next_blank))
+                state_record.add(next_code)
+        if stats is not None:
+            stats.expanded += 1
+            stats.generated += len(Puzzle.move_table[node.blank])
+    if stats is not None:
+        set_closed_stats(stats, len(state_record), len(state_record) - 1)
+
+
+# every generated state is either new or a duplicate; new_states counts the ones that were kept
+def set_closed_stats(stats, closed_size, new_states):
+    stats.closed_peak = closed_size
+    stats.duplicates = stats.generated - new_states
+
+
+# ## Bidirectional Breath-first Search
+
+# In[7]:
+
+
+# the actions in direction order, the inverse of direction d is 3 - d;
+# a visited state is stored as blank * 5 + the direction of the move that reached it (4 for the root)
+ACTIONS = ('UP', 'LEFT', 'RIGHT', 'DOWN')
+ROOT_MOVE = 4
+
+
+# expand the layers of the two sides from start_code and goal_code, always the smaller layer first, until
+# they meet; a state reached from one side is only looked up in the last layer of the other side, which
+# is enough to find the first meeting state, and that state is on an optimal path. in frontier mode a side
+# keeps only its last two layers (every move changes the parity of the blank space, so the neighbours of
+# a layer are in the layers before and after it); otherwise it keeps every visited state.
+# return [meeting state, its depth from start_code and goal_code, the forward and backward records]
+def bidirectional_search(Puzzle, start_code, start_blank, goal_code, goal_blank, frontier = False):
+    direction_table = Puzzle.direction_table
+    sides = []
+    for code, blank in [[start_code, start_blank], [goal_code, goal_blank]]:
+        layer = {code: blank * 5 + ROOT_MOVE}
+        # [previous layer, current layer, every visited state or None in frontier mode, depth]
+        sides.append([{}, layer, None if frontier else dict(layer), 0])
+
+    while sides[0][1] and sides[1][1]:
+        s = 0 if len(sides[0][1]) <= len(sides[1][1]) else 1
+        previous, current, visited, depth = sides[s]
+        other_layer = sides[1 - s][1]
+        next_layer = {}
+        for code, move in current.items():
+            blank = move // 5
+            for direction, next_blank in direction_table[blank]:
+                if direction == 3 - move % 5:
+                    continue  # moving back to the parent
+                next_code = Puzzle.get_next_code(code, blank, next_blank)
+                if next_code in next_layer or next_code in previous:
+                    continue
+                if visited is not None and next_code in visited:
+                    continue
+                next_move = next_blank * 5 + direction
+                next_layer[next_code] = next_move
+                if visited is not None:
+                    visited[next_code] = next_move
+                if next_code in other_layer:  # the two sides meet
+                    sides[s] = [current, next_layer, visited, depth + 1]
+                    forward, backward = sides
+                    return [next_code, forward[3], backward[3],
+                            forward[2] or forward[1], backward[2] or backward[1]]
+        sides[s] = [current, next_layer, visited, depth + 1]
+    return None
+
+
+# get the actions from start_code to goal_code by bidirectional BFS. the path is rebuilt from the move
+# records; in frontier mode the older layers are gone, so the halves before and after the meeting
+# state are searched again recursively
+def get_bidirectional_actions(Puzzle, start_code, start_blank, goal_code, goal_blank, frontier = False):
+    if start_code == goal_code:
+        return []
+    result = bidirectional_search(Puzzle, start_code, start_blank, goal_code, goal_blank, frontier)
+    if result is None:
+        return None
+    [meet_code, forward_depth, backward_depth, forward, backward] = result
+    offsets = tuple(Puzzle.board.actions_offset[action] for action in ACTIONS)
+
+    if frontier:
+        meet_blank = forward[meet_code] // 5
+        if forward_depth <= 1:
+            first_half = [ACTIONS[forward[meet_code] % 5]] if forward_depth else []
+        else:
+            first_half = get_bidirectional_actions(Puzzle, start_code, start_blank,
+                                                   meet_code, meet_blank, frontier)
+        if backward_depth <= 1:
+            second_half = [ACTIONS[3 - backward[meet_code] % 5]] if backward_depth else []
+        else:
+            second_half = get_bidirectional_actions(Puzzle, meet_code, meet_blank,
+                                                    goal_code, goal_blank, frontier)
+        return first_half + second_half
+
+    # walk the forward records back to start_code, then the backward records on to goal_code
+    first_half = []
+    code = meet_code
+    while forward[code] % 5 != ROOT_MOVE:
+        direction, blank = forward[code] % 5, forward[code] // 5
+        first_half.append(ACTIONS[direction])
+        code = Puzzle.get_next_code(code, blank, blank - offsets[direction])
+    second_half = []
+    code = meet_code
+    while backward[code] % 5 != ROOT_MOVE:
+        direction, blank = backward[code] % 5, backward[code] // 5
+        second_half.append(ACTIONS[3 - direction])
+        code = Puzzle.get_next_code(code, blank, blank - offsets[direction])
+    return first_half[::-1] + second_half
+
+
+def bidirectional_bfs(Puzzle, frontier = False):
+    if (Puzzle.init_code == Puzzle.goal_code):
+        return None
+    if not Puzzle.is_solvable():
+        return None
+    goal_blank = Puzzle.find_blank_space(Puzzle.get_goal_state())
+    actions = get_bidirectional_actions(Puzzle, Puzzle.init_code, Puzzle.init_blank,
+                                        Puzzle.goal_code, goal_blank, frontier)
+    return get_solution_node(Puzzle, actions)
 
 
 # ## A* Search
@@ -170,31 +451,284 @@ def bfs(Puzzle):
 # In[6]:
 
 
-def a_star(Puzzle,h_flag=0):
-    init_node = Node(Puzzle.init_state)
-    goal_state = Puzzle.get_goal_state()
-    if (Puzzle.init_state == goal_state):
+# get the integer coefficients [g_scale, h_scale] of f = g + weight * h, scaled so that the bucket open list
+# can keep integer f-values, e.g. weight 1.5 gives f = 2g + 3h; the weight is rounded to a tenth at most
+def get_weight_scales(weight = 1):
+    weight = Fraction(weight).limit_denominator(10)
+    return [weight.denominator, weight.numerator]
+
+
+# weighted A* (WASTAR) when weight > 1: f = g + weight * h, and the solution is at most weight times
+# longer than the optimal one for a consistent heuristic
+def a_star(Puzzle, h_flag=0, stats = None, weight = 1):
+    init_node = Node(Puzzle.init_code, blank=Puzzle.init_blank,
+                     h=Puzzle.h_value(Puzzle.init_state, h_flag))
+    goal_code = Puzzle.goal_code
+    if (Puzzle.init_code == goal_code):
         return None
-    state_record = set()
-    state_record.add(tuple(Puzzle.init_state))
-    tree = PriorityQueue()  # Priority Queue
-    tree.put((1, init_node))
+    g_scale, h_scale = get_weight_scales(weight)
+    state_record = set()  # expanded states
+    tree = BucketOpenList()  # buckets of f-values, ties broken by the larger g
+    tree.push(Puzzle.init_code, init_node, h_scale * init_node.h, 0)
 
     while tree:
-        priority, node = tree.get()
-        state = node.state
-        valid_actions = Puzzle.filter_actions(state)
-        for action in valid_actions:
-            next_state = Puzzle.get_next_state(state, action)
-            if next_state == goal_state:
-                return node.get_next_node(next_state, action, node.depth + 1)
-            elif tuple(next_state) not in state_record:
-                g_value = node.depth
-                h_value = Puzzle.h_value(next_state,h_flag)
-                f_value = g_value + h_value
-                tree.put((f_value, (node.get_next_node(next_state, action,
-                                                       node.depth + 1))))
-                state_record.add(tuple(next_state))
+        if stats is not None:
+            stats.update_open(len(tree))
+        node, f_value, g_value = tree.pop()
+        code = node.state
+        if code == goal_code:
+            if stats is not None:
+                set_closed_stats(stats, len(state_record), tree.pushes - 1)
+            return node
+        state_record.add(code)
+        if stats is not None:
+            stats.expanded += 1
+            stats.generated += len(Puzzle.move_table[node.blank])
+        next_g = g_value + 1
+        for action, next_blank in Puzzle.move_table[node.blank]:
+            next_code = Puzzle.get_next_code(code, node.blank, next_blank)
+            if next_code in state_record:
+                continue
+            open_g = tree.get_g(next_code)
+            if open_g is not None and open_g <= next_g:
+                continue  # already reached by a path that is not longer
+            h_value = Puzzle.get_next_h(node.h, code, node.blank, next_blank, h_flag)
+            tree.push(next_code, node.get_next_node(next_code, action, next_g, next_blank, h_value),
+                      g_scale * next_g + h_scale * h_value, next_g)
+    if stats is not None:
+        set_closed_stats(stats, len(state_record), tree.pushes - 1)
+
+
+# ## Anytime Repairing A* Search
+
+# In[12]:
+
+
+# raised when a search runs out of its budget before it finds any solution: the time of ARA*,
+# the memory of SMA*
+class SearchLimitError(Exception):
+    pass
+
+
+# ARA*: a series of weighted A* searches with the weight lowered by `step` down to 1 that reuse the search
+# effort of the previous ones. callback(leaf node, bound) is called on each solution found, where the
+# solution is at most `bound` times longer than the optimal one; the search stops at bound 1 or once
+# time_limit seconds are over. return the best leaf node, or raise SearchLimitError if time_limit is over
+# before the first solution
+def ara_star(Puzzle, h_flag = 0, weight = 3, step = 0.5, time_limit = None, callback = None, stats = None):
+    goal_code = Puzzle.goal_code
+    if (Puzzle.init_code == goal_code):
+        return None
+    if not Puzzle.is_solvable():
+        return None
+    deadline = None if time_limit is None else datetime.now() + timedelta(seconds = time_limit)
+    init_node = Node(Puzzle.init_code, blank=Puzzle.init_blank,
+                     h=Puzzle.h_value(Puzzle.init_state, h_flag))
+    nodes = {Puzzle.init_code: init_node}  # the best node reaching each state, its g is the depth
+    open_keys = [Puzzle.init_code]
+    goal_node = None
+    bound = None
+
+    while True:
+        g_scale, h_scale = get_weight_scales(weight)
+        tree = BucketOpenList()
+        for code in open_keys:
+            node = nodes[code]
+            tree.push(code, node, g_scale * node.depth + h_scale * node.h, node.depth)
+        state_record = set()
+        inconsistent = set()  # closed states whose g decreased in this search
+        if stats is not None:
+            stats.iterations += 1
+        finished = improve_path(Puzzle, tree, nodes, state_record, inconsistent, g_scale, h_scale,
+                                h_flag, deadline, stats)
+        if stats is not None:
+            stats.closed_peak = max(stats.closed_peak, len(state_record))
+        open_keys = list(tree.open_g) + list(inconsistent)
+        if goal_code in nodes:
+            # the solution is within weight of the optimal one, and within g / the smallest g + h left
+            bound = min(Fraction(weight), Fraction(nodes[goal_code].depth,
+                                                   min(nodes[code].depth + nodes[code].h for code in open_keys)))
+            if nodes[goal_code] is not goal_node:
+                goal_node = nodes[goal_code]
+                if callback:
+                    callback(goal_node, float(bound))
+        if not finished and goal_node is None:
+            raise SearchLimitError('No solution within ' + str(time_limit) + 's')
+        if not finished or weight == 1 or (bound is not None and bound <= 1):
+            return goal_node
+        weight = max(1, Fraction(weight).limit_denominator(10) - Fraction(step).limit_denominator(10))
+
+
+# expand the states of the open list until the goal has the smallest f-value; a state reached by a shorter
+# path after it was closed goes to `inconsistent` and is searched again with the next weight. the goal
+# is left in the open list. return False if the deadline is over first
+def improve_path(Puzzle, tree, nodes, state_record, inconsistent, g_scale, h_scale, h_flag, deadline, stats):
+    goal_code = Puzzle.goal_code
+    expanded = 0
+    while tree:
+        if stats is not None:
+            stats.update_open(len(tree))
+        node, f_value, g_value = tree.pop()
+        code = node.state
+        if code == goal_code:
+            tree.push(code, node, f_value, g_value)
+            return True
+        expanded += 1
+        if deadline is not None and expanded % 1024 == 0 and datetime.now() >= deadline:
+            tree.push(code, node, f_value, g_value)
+            return False
+        state_record.add(code)
+        if stats is not None:
+            stats.expanded += 1
+            stats.generated += len(Puzzle.move_table[node.blank])
+        next_g = g_value + 1
+        for action, next_blank in Puzzle.move_table[node.blank]:
+            next_code = Puzzle.get_next_code(code, node.blank, next_blank)
+            old_node = nodes.get(next_code)
+            if old_node is not None and old_node.depth <= next_g:
+                continue
+            h_value = old_node.h if old_node is not None else \
+                Puzzle.get_next_h(node.h, code, node.blank, next_blank, h_flag)
+            next_node = node.get_next_node(next_code, action, next_g, next_blank, h_value)
+            nodes[next_code] = next_node
+            if next_code in state_record:
+                inconsistent.add(next_code)
+            else:
+                tree.push(next_code, next_node, g_scale * next_g + h_scale * h_value, next_g)
+    return True
+
+
+# ## Memory-bounded A* Search
+
+# In[13]:
+
+
+class BoundedNode(Node):
+    # node of SMA*: f is the backed-up f-value, children the successors kept in memory by state,
+    # forgotten the backed-up f-value of each successor dropped from memory by state, and version is raised
+    # whenever the node changes so that its old heap entries are skipped
+    def __init__(self, state, parent=None, action=None, depth=0, blank=None, h=0, f=0):
+        Node.__init__(self, state, parent, action, depth, blank, h)
+        self.f = f
+        self.children = {}
+        self.forgotten = {}
+        self.version = 0
+
+    # the f-value of expanding the node: its own f before the first expansion, then the smallest
+    # f-value of the successors that have to be regenerated
+    def get_open_f(self):
+        return min(self.forgotten.values()) if self.forgotten else self.f
+
+
+# estimate the bytes of one node of SMA* in memory: the node, its attributes, its children entry
+# in the parent and its entries in the two heaps
+def get_node_bytes(Puzzle):
+    node = BoundedNode(Puzzle.init_code, blank=Puzzle.init_blank)
+    child = BoundedNode(Puzzle.goal_code, node, 'UP', 1, 0)
+    node.children[child.state] = child
+    return (sys.getsizeof(child) + sys.getsizeof(child.__dict__) + sys.getsizeof(child.children) +
+            sys.getsizeof(child.state) + 2 * sys.getsizeof((0, 0, 0, 0, child)) +
+            sys.getsizeof(node.children) // len(node.children))
+
+
+# SMA*: A* that keeps at most max_nodes nodes (or max_bytes, counted with get_node_bytes) in memory.
+# when memory is full, the worst leaf (largest f, then shallowest) is dropped and its f-value is backed
+# up to its parent, which regenerates its dropped successors once that f-value is the best one again.
+# the solution is optimal if it fits in memory together with the siblings of its path; otherwise the
+# best solution that fits is returned, or SearchLimitError is raised if none does
+def sma_star(Puzzle, h_flag = 0, max_nodes = 200000, max_bytes = None, stats = None):
+    goal_code = Puzzle.goal_code
+    if (Puzzle.init_code == goal_code):
+        return None
+    if not Puzzle.is_solvable():
+        return None
+    if max_bytes is not None:
+        max_nodes = min(max_nodes, max_bytes // get_node_bytes(Puzzle))
+    inf = float('inf')
+    h_value = Puzzle.h_value(Puzzle.init_state, h_flag)
+    root = BoundedNode(Puzzle.init_code, blank=Puzzle.init_blank, h=h_value, f=h_value)
+    best = []  # heap of (f, -depth, ...) of the nodes to expand: new leaves and nodes with dropped successors
+    worst = []  # heap of (-f, depth, ...) of the leaves, the nodes that can be dropped
+    entries = [0]  # number of heap entries, breaks ties in the order of insertion
+
+    # push the node to the heaps it belongs to after it changed
+    def update(node):
+        node.version += 1
+        entries[0] += 1
+        open_f = node.get_open_f()
+        if open_f != inf or not node.children:
+            heappush(best, (open_f, -node.depth, entries[0], node.version, node))
+        if not node.children and node.parent is not None:
+            heappush(worst, (-node.f, node.depth, entries[0], node.version, node))
+
+    # pop the heap down to its first live entry and return its node, or None if there is none
+    def get_node(heap):
+        while heap:
+            if heap[0][4].version == heap[0][3]:
+                return heap[0][4]
+            heappop(heap)
+        return None
+
+    update(root)
+    size = 1
+
+    while True:
+        node = get_node(best)
+        if node is None or node.get_open_f() == inf:
+            raise SearchLimitError('No solution within ' + str(max_nodes) + ' nodes')
+        if node.state == goal_code:
+            return node
+
+        # generate the successors that are not in memory; pathmax keeps f from decreasing along a path, and a
+        # regenerated successor gets back the f-value it was dropped with, so that no search effort is lost
+        code = node.state
+        open_f = node.get_open_f()
+        next_g = node.depth + 1
+        prev_blank = None if node.parent is None else node.parent.blank
+        generated = 0
+        for action, next_blank in Puzzle.move_table[node.blank]:
+            if next_blank == prev_blank:
+                continue
+            next_code = Puzzle.get_next_code(code, node.blank, next_blank)
+            if next_code in node.children:
+                continue
+            h_value = Puzzle.get_next_h(node.h, code, node.blank, next_blank, h_flag)
+            if next_code != goal_code and next_g + len(Puzzle.move_table[next_blank]) >= max_nodes:
+                f_value = inf  # the path and the siblings of a deeper node cannot fit in memory
+            else:
+                f_value = max(open_f, next_g + h_value, node.forgotten.get(next_code, 0))
+            child = BoundedNode(next_code, node, action, next_g, next_blank, h_value, f_value)
+            node.children[next_code] = child
+            update(child)
+            generated += 1
+        size += generated
+        node.forgotten = {}
+        update(node)
+        if stats is not None:
+            stats.expanded += 1
+            stats.generated += generated
+            stats.update_open(len(best))
+            stats.closed_peak = max(stats.closed_peak, size)
+
+        # back the smallest f-value of the successors up to the ancestors
+        while node is not None:
+            f_value = min([child.f for child in node.children.values()] + list(node.forgotten.values()), default = inf)
+            if f_value == node.f:
+                break
+            node.f = f_value
+            node = node.parent
+
+        # drop the worst leaves until the nodes fit in memory
+        while size > max_nodes:
+            leaf = get_node(worst)
+            if leaf is None:
+                break
+            parent = leaf.parent
+            leaf.version += 1
+            del parent.children[leaf.state]
+            parent.forgotten[leaf.state] = leaf.f
+            update(parent)
+            size -= 1
 
 
 # ## Iterative Deepening A* Search
@@ -202,23 +736,22 @@ def a_star(Puzzle,h_flag=0):
 # In[14]:
 
 
-def ida_star(Puzzle, h_flag = 0):
-    init_node = Node(Puzzle.init_state)
-    goal_state = Puzzle.get_goal_state()
-    if (Puzzle.init_state == goal_state):
+def ida_star(Puzzle, h_flag = 0, stats = None):
+    if (Puzzle.init_code == Puzzle.goal_code):
         return None
-    limit = Puzzle.h_value(Puzzle.init_state, h_flag)
-    tree = [init_node]
-    g_value = init_node.depth
-    h_value = Puzzle.h_value(init_node.state, h_flag)
-    f_value = g_value + h_value
-    state_record = set()
-    state_record.add(tuple(Puzzle.init_state))
+    if not Puzzle.is_solvable():  # the limit would be raised forever
+        return None
+    board = list(Puzzle.init_state)
+    h_value = Puzzle.h_value(board, h_flag)
+    limit = h_value
 
     while True:  # if not found, start a new DFS
-        t = search(Puzzle, tree, limit, f_value, state_record, h_flag)
-        if isinstance(t, Node):
-            return t
+        if stats is not None:
+            stats.iterations += 1
+            stats.thresholds.append(limit)
+        t = search(Puzzle, board, limit, h_value, h_flag, stats = stats)
+        if isinstance(t, list):
+            return get_solution_node(Puzzle, t)
         if t == float('inf'):
             return None
         limit = t
@@ -227,43 +760,186 @@ def ida_star(Puzzle, h_flag = 0):
 # In[15]:
 
 
-# get the nodes in (depth+1) by sorting f_values of nodes in an ascending order
-def successors(Puzzle, init_node, h_flag = 0):
-    sorted_nodes = []
-    valid_actions = Puzzle.filter_actions(init_node.state)
-
-    for action in valid_actions:
-        next_state = Puzzle.get_next_state(init_node.state, action)
-        node = init_node.get_next_node(next_state, action, init_node.depth + 1)
-        g_value = node.depth
-        h_value = Puzzle.h_value(next_state,h_flag)
-        f_value = g_value + h_value
-        sorted_nodes.append([f_value, node, next_state])
-    return sorted(sorted_nodes, key=lambda x: x[0])
-
-
-# return minimum f-value that exceed the previous limit until get the final result
-def search(Puzzle, tree, limit, f_value, state_record, h_flag = 0):
-    node = tree[-1]
-    state = node.state
-
-    if f_value > limit:
-        return f_value
-    if state == Puzzle.get_goal_state():
-        return node  # reach the goal state
-    minf = float('inf')  # set an initial minf
-
-    for f_value, next_node, next_state in successors(Puzzle, node, h_flag):  # BFS
-        if tuple(next_state) not in state_record:
-            tree.append(next_node)
-            state_record.add(tuple(next_state))
-            t = search(Puzzle, tree, limit, f_value, state_record, h_flag = 0)  # DFS
-            if isinstance(t, Node):
-                return t
-            minf = min(minf, t)
-            tree.pop()  # stack pop
-            state_record.remove(tuple(next_state))
-    return minf
+# build the Node chain of a solution from its action list, only done once the goal is reached
+def get_solution_node(Puzzle, actions, node = None):
+    if node is None:
+        node = Node(Puzzle.init_code, blank=Puzzle.init_blank)
+    for action in actions:
+        for next_action, next_blank in Puzzle.move_table[node.blank]:
+            if next_action == action:
+                next_code = Puzzle.get_next_code(node.state, node.blank, next_blank)
+                node = node.get_next_node(next_code, action, node.depth + 1, next_blank)
+                break
+    return node
+
+
+# depth-first search bounded by limit on one mutable board: moves are applied and undone in place,
+# the inverse of the previous move is pruned instead of keeping a visited set, and h is updated
+# incrementally. depth and prev_blank let the search start below the root of the puzzle.
+# stats counts every state whose children are tried as expanded, and the deepest path as open_peak.
+# return the action list when the goal is reached (the board is left at the goal state),
+# otherwise the minimum f-value that exceeds limit
+def search(Puzzle, board, limit, h_value, h_flag = 0, depth = 0, prev_blank = None, stats = None):
+    move_table = Puzzle.move_table
+    goal_state = Puzzle.get_goal_state()
+    h_table = Puzzle.h_tables.get(h_flag)
+    pattern_database = Puzzle.get_pattern_database() if h_flag == 3 else None
+    tile_positions = [0] * len(board)
+    for cell, tile in enumerate(board):
+        tile_positions[tile] = cell
+
+    # per-depth stacks, the entry at the top describes the current state
+    root = depth
+    blanks = [prev_blank, board.index(0)]
+    h_values = [None, h_value]
+    move_indexes = [0, 0]  # the index of the next move to try in move_table
+    actions = [None, None]
+    top = 1
+    minf = float('inf')
+    if stats is not None:
+        stats.expanded += 1
+        stats.generated += len(move_table[blanks[1]]) - (prev_blank is not None)
+        stats.update_open(root + 1)
+
+    while True:
+        blank = blanks[top]
+        moves = move_table[blank]
+        i = move_indexes[top]
+        if i == len(moves):  # all the children are searched, undo the move into this state
+            if top == 1:
+                return minf
+            prev = blanks[top - 1]
+            tile = board[prev]
+            board[blank] = tile
+            board[prev] = 0
+            tile_positions[tile] = blank
+            top -= 1
+            continue
+        move_indexes[top] = i + 1
+        action, next_blank = moves[i]
+        if next_blank == blanks[top - 1]:
+            continue  # moving the blank space back is the inverse of the previous move
+
+        tile = board[next_blank]
+        h = h_values[top]
+        if h_table is not None:
+            h_row = h_table[tile]
+            next_h = h - h_row[next_blank] + h_row[blank]
+        elif pattern_database is not None:
+            next_h = pattern_database.get_next_h(h, tile_positions, tile, blank)
+        else:
+            board[blank], board[next_blank] = tile, 0
+            next_h = Puzzle.h_value(board, h_flag)
+            board[blank], board[next_blank] = 0, tile
+        f_value = root + top + next_h
+        if f_value > limit:
+            if f_value < minf:
+                minf = f_value
+            continue
+
+        # apply the move in place
+        board[blank] = tile
+        board[next_blank] = 0
+        tile_positions[tile] = blank
+        top += 1
+        if top == len(blanks):
+            blanks.append(next_blank)
+            h_values.append(next_h)
+            move_indexes.append(0)
+            actions.append(action)
+        else:
+            blanks[top] = next_blank
+            h_values[top] = next_h
+            move_indexes[top] = 0
+            actions[top] = action
+        if next_h == 0 and board == goal_state:  # reach the goal state
+            return actions[2:top + 1]
+        if stats is not None:
+            stats.expanded += 1
+            stats.generated += len(move_table[next_blank]) - 1
+            stats.update_open(root + top)
+
+
+# ## Parallel Iterative Deepening A* Search
+
+# In[16]:
+
+
+# the puzzle of a worker process, built once by the pool initializer
+worker_puzzle = None
+
+
+def init_worker(init_state, shape = None, goal_state = None):
+    global worker_puzzle
+    worker_puzzle = Puzzle(init_state, shape, goal_state)
+
+
+def search_subtree(board, limit, h_value, h_flag, depth, prev_blank):
+    return search(worker_puzzle, board, limit, h_value, h_flag, depth, prev_blank)
+
+
+# expand the root level by level up to split_depth, pruning the inverse of the previous move as search does;
+# return the frontier as [board, actions, prev_blank, h_value] in DFS order, or the actions of a shallower goal
+def split_frontier(Puzzle, h_flag = 0, split_depth = 4):
+    goal_state = Puzzle.get_goal_state()
+    frontier = [[list(Puzzle.init_state), [], None, Puzzle.h_value(Puzzle.init_state, h_flag)]]
+    for depth in range(split_depth):
+        next_frontier = []
+        for board, actions, prev_blank, h_value in frontier:
+            blank = board.index(0)
+            for action, next_blank in Puzzle.move_table[blank]:
+                if next_blank == prev_blank:
+                    continue
+                next_board = list(board)
+                next_board[blank], next_board[next_blank] = next_board[next_blank], 0
+                if next_board == goal_state:
+                    return None, actions + [action]
+                next_frontier.append([next_board, actions + [action], blank,
+                                      Puzzle.h_value(next_board, h_flag)])
+        frontier = next_frontier
+    return frontier, None
+
+
+# IDA* with the subtrees below split_depth searched by worker processes in each iteration; the next limit
+# is the minimum exceeding f-value over all subtrees. results are taken in DFS order, so the first
+# subtree that reaches the goal gives the same path as ida_star, and the pool is terminated right away
+def parallel_ida_star(Puzzle, h_flag = 0, split_depth = 4, processes = None):
+    if (Puzzle.init_code == Puzzle.goal_code):
+        return None
+    if not Puzzle.is_solvable():
+        return None
+    frontier, actions = split_frontier(Puzzle, h_flag, split_depth)
+    if actions is not None:
+        return get_solution_node(Puzzle, actions)
+    limit = Puzzle.h_value(Puzzle.init_state, h_flag)
+    pool = multiprocessing.Pool(processes or os.cpu_count(), init_worker,
+                                [Puzzle.init_state, (Puzzle.rows, Puzzle.columns), Puzzle.goal_state])
+
+    try:
+        while True:  # if not found, start a new iteration
+            minf = float('inf')
+            tasks = []
+            for board, actions, prev_blank, h_value in frontier:
+                f_value = len(actions) + h_value
+                if f_value > limit:
+                    minf = min(minf, f_value)
+                    tasks.append(None)
+                else:
+                    tasks.append(pool.apply_async(search_subtree, [board, limit, h_value, h_flag,
+                                                                   len(actions), prev_blank]))
+            for i, task in enumerate(tasks):
+                if task is None:
+                    continue
+                t = task.get()
+                if isinstance(t, list):
+                    return get_solution_node(Puzzle, frontier[i][1] + t)
+                minf = min(minf, t)
+            if minf == float('inf'):
+                return None
+            limit = minf
+    finally:
+        pool.terminate()  # cancel the subtrees that are still searched
+        pool.join()
 
 
 # ## Read and write files
@@ -271,18 +947,76 @@ def search(Puzzle, tree, limit, f_value, state_record, h_flag = 0):
 # In[9]:
 
 
-def read_initial_state(file, process):
-    df = pd.read_csv(input_file_path + "/" + file, header=None, index_col=None)
-    size = df.iloc[0].to_string().split(' ')[4]
-    initial_state = []
-    for i in range(1, int(size)+1):  
-        row_str = df.iloc[i].to_string().split(' ')[4:]
-        row_arr = [int(i) for i in row_str]
-        initial_state += row_arr
-        process.append([' '.join([str(elem) for elem in row_arr])])
-
-#     astar_steps = int(df.iloc[int(size)+1].to_string().split(' ')[6])
-    return [size, initial_state]
+# read the puzzles of a plain-text file one block at a time: a line with only the size, then `size` rows;
+# any other line (e.g. "AStar steps: 4") is skipped. yield [size, initial_state, rows]
+def read_puzzle_blocks(file_path):
+    with open(file_path) as f:
+        block = None  # [shape, initial_state, rows, goal_state] of the block being read
+        done = None  # the last complete block, yielded once it is known whether a goal follows
+        tiles = None  # the tiles being read: the initial state, or the goal state after a 'goal' line
+        for line_num, line in enumerate(f, 1):
+            values = line.split()
+            if not values:
+                continue
+            if tiles is None:
+                if done is not None and len(values) == 1 and values[0].lower() == 'goal':
+                    block = done
+                    tiles = block[3] = []
+                    continue
+                if done is not None:
+                    yield done
+                    done = None
+                if len(values) <= 2 and all(value.isdigit() for value in values):
+                    tiles = []
+                    block = [(int(values[0]), int(values[-1])), tiles, [], None]
+                continue
+            rows, columns = block[0]
+            if len(values) != columns:
+                raise ValueError(file_path + ':' + str(line_num) + ': expected ' + str(columns) + ' tiles')
+            row_arr = [int(value) for value in values]
+            tiles += row_arr
+            if tiles is block[1]:
+                block[2].append(' '.join([str(elem) for elem in row_arr]))
+            if len(tiles) == rows * columns:
+                done = block
+                tiles = None
+        if tiles is not None and tiles is block[3]:
+            raise ValueError(file_path + ': the goal state is not complete')
+        if done is not None:
+            yield done
+
+
+# get [base directory, puzzle file paths] of a directory, a glob pattern or a single file; the base directory
+# of a glob pattern is the common directory of the files it matches, or the part of the pattern before
+# its first wildcard if it matches none
+def get_puzzle_source(source):
+    if os.path.isdir(source):
+        return [source, [os.path.join(source, file) for file in sorted(get_puzzle_files(source))]]
+    if any(c in source for c in '*?['):
+        file_paths = sorted(file_path for file_path in glob.glob(source) if os.path.isfile(file_path))
+        if file_paths:
+            return [os.path.commonpath([os.path.abspath(os.path.dirname(file_path)) for file_path in file_paths]),
+                    file_paths]
+        parts = []
+        for part in os.path.dirname(source).split(os.sep):
+            if any(c in part for c in '*?['):
+                break
+            parts.append(part)
+        return [os.sep.join(parts) or '.', []]
+    return [os.path.dirname(source) or '.', [source]]
+
+
+# read the puzzles of a directory, a glob pattern or a single file with one or more puzzle blocks;
+# yield [name, shape, initial_state, rows, goal_state] where the name is the path of the file from the base
+# directory of get_puzzle_source with '_' between its parts (the file name unless a glob pattern matches
+# files in several directories), followed by _2, _3, ... for the later blocks of a multi-puzzle file,
+# shape is (rows, columns) and goal_state is None for the default goal
+def read_puzzles(source):
+    base, file_paths = get_puzzle_source(source)
+    for file_path in file_paths:
+        file = os.path.relpath(os.path.abspath(file_path), os.path.abspath(base)).replace(os.sep, '_')
+        for i, [shape, initial_state, rows, goal_state] in enumerate(read_puzzle_blocks(file_path)):
+            yield [file if i == 0 else file + '_' + str(i + 1), shape, initial_state, rows, goal_state]
 
 
 # In[10]:
@@ -304,12 +1038,92 @@ def calculate_running_time(starting_time, ending_time, process,
 # In[11]:
 
 
-def write_process(file, process, path):
-    output = pd.DataFrame(process)
-    output.to_csv(path + '/' + algorithm + '_' + file + '_result.csv',
-                  encoding='utf-8',
-                  header = False,
-                  index = False)
+# get the puzzle files in the path, skipping the output folders and result files
+def get_puzzle_files(path):
+    files = []
+    for file in os.listdir(path):
+        if os.path.isdir(os.path.join(path, file)):
+            continue
+        if file.endswith('.csv') or file.endswith('.jsonl') or file.endswith('.json'):
+            continue
+        if '.ipynb_checkpoints' in file:
+            continue
+        if 'BFS' in file:
+            continue
+        if 'ASTAR' in file:
+            continue
+        if 'IDASTAR' in file:
+            continue
+        files.append(file)
+    return files
+
+
+# write whether the goal state can be reached from the initial state
+def write_solvability(process, solvable):
+    if solvable:
+        process.append(['The puzzle is solvable'])
+    else:
+        process.append(['The puzzle is unsolvable and no search is run'])
+
+
+# write that the solution was read from the solution cache instead of searched
+def write_cache_hit(process):
+    process.append(['The solution is read from the cache and no search is run'])
+
+
+# write the actions of a solution; actions is None if the initial state is the goal state
+def write_solution(process, actions):
+    if (actions == None):
+        process.append(['The initial state is the goal state'])
+    else:
+        for action in actions:
+            process.append([action])
+        process.append([
+            'It took ' + str(len(actions)) +
+            ' steps to reach the goal state'
+        ])
+
+
+def write_process(file, process, path, algorithm):
+    with open(path + '/' + algorithm + '_' + file + '_result.csv', 'w',
+              encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(process)
+
+
+class ResultWriter(object):
+    # buffered writer that appends one record per finished run; a .jsonl path gets one JSON object
+    # per line, any other path gets CSV rows with the header written once to a new file
+    def __init__(self, path, header = None, buffer_size = 1 << 16):
+        self.jsonl = path.endswith('.jsonl')
+        self.header = header
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', encoding='utf-8', newline='', buffering=buffer_size)
+        self.writer = None if self.jsonl else csv.writer(self.file, lineterminator='\n')
+        if is_new and header and not self.jsonl:
+            self.writer.writerow(header)
+
+    # write a dict, or a list in the order of the header
+    def write(self, record):
+        if self.jsonl:
+            if not isinstance(record, dict):
+                record = dict(zip(self.header, record))
+            self.file.write(json.dumps(record) + '\n')
+        else:
+            if isinstance(record, dict):
+                record = [record.get(key, '') for key in self.header]
+            self.writer.writerow(record)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 
 # ## Main function
@@ -317,61 +1131,155 @@ def write_process(file, process, path):
 # In[17]:
 
 
-def main(algorithm, h_flag = 0):
+# implement BFS, BIBFS (bidirectional BFS), FBFS (bidirectional frontier BFS), ASTAR, IDASTAR,
+# PIDASTAR (parallel IDASTAR), WASTAR (weighted ASTAR), ARASTAR (anytime repairing ASTAR, starting
+# from `weight` and stopping after time_limit seconds, with callback(leaf node, bound) on each solution)
+# and SMASTAR (memory-bounded ASTAR within max_nodes nodes or max_bytes bytes);
+# the board is square unless its shape (rows, columns) is given, and goal_state replaces [0,1,...,n-1].
+# return the leaf node, or None if the initial state is the goal state; ARASTAR and SMASTAR raise
+# SearchLimitError if they find no solution within their time or memory budget.
+# with a SearchStats, the setup (tables and pattern databases) and the search are timed as phases,
+# and BFS, ASTAR, IDASTAR, WASTAR, ARASTAR and SMASTAR fill its node counters
+def solve(initial_state, algorithm, h_flag = 0, stats = None, weight = 2, time_limit = 10, callback = None,
+          max_nodes = 200000, max_bytes = None, shape = None, goal_state = None):
+    if stats is not None:
+        stats.start_phase('setup')
+    puzzle = Puzzle(initial_state, shape, goal_state)
+    if stats is not None:
+        if uses_pattern_database(algorithm, h_flag):
+            puzzle.get_pattern_database()  # keep loading the tables out of the search phase
+        stats.start_phase('search')
+
+    leaf_node = None
+    if (algorithm == 'BFS'):
+        leaf_node = bfs(puzzle, stats)
+    elif (algorithm == 'BIBFS'):
+        leaf_node = bidirectional_bfs(puzzle)
+    elif (algorithm == 'FBFS'):
+        leaf_node = bidirectional_bfs(puzzle, frontier = True)
+    elif (algorithm == 'ASTAR'):
+        leaf_node = a_star(puzzle, h_flag, stats)
+    elif (algorithm == 'IDASTAR'):
+        leaf_node = ida_star(puzzle, h_flag, stats)
+    elif (algorithm == 'PIDASTAR'):
+        leaf_node = parallel_ida_star(puzzle, h_flag)
+    elif (algorithm == 'WASTAR'):
+        leaf_node = a_star(puzzle, h_flag, stats, weight)
+    elif (algorithm == 'ARASTAR'):
+        leaf_node = ara_star(puzzle, h_flag, weight, time_limit = time_limit, callback = callback, stats = stats)
+    elif (algorithm == 'SMASTAR'):
+        leaf_node = sma_star(puzzle, h_flag, max_nodes, max_bytes, stats)
+    if stats is not None:
+        stats.end_phase()
+    return leaf_node
+
+
+# check whether the search of the algorithm uses the pattern database; the BFS variants have no heuristic
+def uses_pattern_database(algorithm, h_flag):
+    return h_flag == 3 and 'BFS' not in algorithm
+
+
+# get the solution of the leaf node, timed as the last phase of the stats; return [actions, stats record]
+def get_solution_stats(leaf_node, stats = None):
+    if stats is not None:
+        stats.start_phase('solution')
+    actions = None if leaf_node == None else leaf_node.get_solution()
+    if stats is None:
+        return [actions, None]
+    stats.stop()
+    return [actions, stats.get_record()]
+
+
+# get a callback of ARASTAR that writes each intermediate solution of the file to the result writer
+# right away, as {file, steps, bound, time from the starting time}
+def get_anytime_callback(writer, file, starting_time):
+    def write_solution_bound(leaf_node, bound):
+        writer.write({'file': file, 'steps': leaf_node.depth, 'bound': bound,
+                      'time': (datetime.now() - starting_time).total_seconds()})
+        writer.flush()
+    return write_solution_bound
+
+
+# with instrument, the node counters, peak memory and phase times of each puzzle are written
+# to <algorithm>_<file>_stats.json next to its _result.csv; tracing memory slows the search down.
+# the intermediate solutions of ARASTAR are appended to <algorithm>_anytime.jsonl as they are found.
+# with a cache_path, solutions are looked up in (and added to) the SolutionCache there before searching
+def main(algorithm, h_flag = 0, instrument = False, cache_path = None):
     puzzle_num = 0
     effec_solve_num = 0
     result = [['file', 'running_time(s)', 'iseffective']]
-    files = os.listdir(input_file_path)
 
     # create a path for output files
     output_file_path = input_file_path + '/' + algorithm
     if not os.path.exists(output_file_path):
         os.mkdir(output_file_path)
+    anytime_writer = None
+    if (algorithm == 'ARASTAR'):
+        anytime_writer = ResultWriter(output_file_path + '/' + algorithm + '_anytime.jsonl')
+    cache = None if cache_path is None else SolutionCache(cache_path)
 
     # read each of input files
-    for file in files:
-        if '.ipynb_checkpoints' in file:
-            continue
-        if 'BFS' in file:
-            continue
-        if 'ASTAR' in file:
-            continue
-        if 'IDASTAR' in file:
-            continue
-
-        process = []
+    for file, shape, initial_state, rows, goal_state in read_puzzles(input_file_path):
+        process = [[row] for row in rows]
         puzzle_num += 1
         print('Read the file ' + file)
         print('----------------------------------')
-        [size, initial_state] = read_initial_state(file, process)
-        print('It is a ' + size + ' X ' + size + ' sliding-tile puzzle')
+        print('It is a ' + str(shape[0]) + ' X ' + str(shape[1]) + ' sliding-tile puzzle')
         print('----------------------------------')
         print('The initial state is ', initial_state)
         print('----------------------------------')
+
+        # skip the search if the goal state cannot be reached
+        puzzle = Puzzle(initial_state, shape, goal_state)
+        solvable = puzzle.is_solvable()
+        write_solvability(process, solvable)
+        if not solvable:
+            print('The puzzle is unsolvable')
+            print('----------------------------------')
+            print('----------------------------------')
+            write_process(file, process, output_file_path, algorithm)
+            result.append([file, '', False])
+            continue
+        # or if the heuristic does not apply to the board
+        if uses_pattern_database(algorithm, h_flag) and not puzzle.has_pattern_database():
+            print(PATTERN_DATABASE_ERROR)
+            print('----------------------------------')
+            print('----------------------------------')
+            process.append([PATTERN_DATABASE_ERROR])
+            write_process(file, process, output_file_path, algorithm)
+            result.append([file, '', False])
+            continue
         starting_time = datetime.now()
         print('Starting time is ', starting_time.strftime('%Y-%m-%d %H:%M:%S'))
         print('----------------------------------')
 
-        # implement BFS, ASAT, IDASTAR
-        leaf_node = None
-        if (algorithm == 'BFS'):
-            leaf_node = bfs(Puzzle(initial_state))
-        elif (algorithm == 'ASTAR'):
-            leaf_node = a_star(Puzzle(initial_state), h_flag)
-        elif (algorithm == 'IDASTAR'):
-            leaf_node = ida_star(Puzzle(initial_state), h_flag)
-
-        ending_time = datetime.now()
-        if (leaf_node == None):
-            process.append(['The initial state is the goal state'])
+        actions = None if cache is None else cache.get(initial_state, algorithm, h_flag, *shape, goal_state)
+        if actions is not None:  # a cache hit skips the search
+            ending_time = datetime.now()
+            write_solution(process, actions)
+            write_cache_hit(process)
         else:
-            actions = leaf_node.get_solution()
-            for action in actions:
-                process.append([action])
-            process.append([
-                'It took ' + str(leaf_node.depth) +
-                ' steps to reach the goal state'
-            ])
+            stats = SearchStats() if instrument else None
+            callback = None if anytime_writer is None else get_anytime_callback(anytime_writer, file, starting_time)
+            try:
+                leaf_node = solve(initial_state, algorithm, h_flag, stats, callback = callback,
+                                  shape = shape, goal_state = goal_state)
+            except SearchLimitError as error:  # not solved
+                print(error)
+                print('----------------------------------')
+                print('----------------------------------')
+                process.append([str(error)])
+                write_process(file, process, output_file_path, algorithm)
+                result.append([file, '', False])
+                continue
+
+            ending_time = datetime.now()
+            actions, record = get_solution_stats(leaf_node, stats)
+            write_solution(process, actions)
+            if record is not None:
+                write_stats(file, record, output_file_path, algorithm)
+            if cache is not None and actions is not None:
+                cache.put(initial_state, algorithm, h_flag, actions, *shape, goal_state)
         print('Ending time is ', ending_time.strftime('%Y-%m-%d %H:%M:%S'))
         print('----------------------------------')
 
@@ -385,12 +1293,233 @@ def main(algorithm, h_flag = 0):
         print('----------------------------------')
 
         # write ouput files
-        write_process(file, process, output_file_path)
+        write_process(file, process, output_file_path, algorithm)
         result.append([file, running_time, iseffective])
 
     print('Solved ' + str(puzzle_num) + ' puzzles')
     print('Effectively solved ' + str(effec_solve_num) + ' puzzles')
-    write_process('total', result, output_file_path)
+    write_process('total', result, output_file_path, algorithm)
+    if anytime_writer is not None:
+        anytime_writer.close()
+    if cache is not None:
+        cache.save()
+
+
+# ## Batch mode
+
+# In[18]:
+
+
+# solve one job in a worker process and send [actions, starting time, ending time, stats record, error] back,
+# where error is the message of a SearchLimitError that left the puzzle unsolved, or None;
+# without trace_memory the stats only count nodes and time phases, which keeps the timings comparable.
+# the intermediate solutions of ARASTAR are appended to anytime_path as {file, steps, bound, time}
+def run_job(connection, initial_state, algorithm, h_flag, instrument = False, trace_memory = True,
+            anytime_path = None, file = None, shape = None, goal_state = None):
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # its own process group, which the worker processes of PIDASTAR join
+    stats = SearchStats(trace_memory) if instrument else None
+    starting_time = datetime.now()
+    anytime_writer = None if anytime_path is None else ResultWriter(anytime_path)
+    callback = None if anytime_writer is None else get_anytime_callback(anytime_writer, file, starting_time)
+    error = None
+    try:
+        leaf_node = solve(initial_state, algorithm, h_flag, stats, callback = callback,
+                          shape = shape, goal_state = goal_state)
+    except SearchLimitError as limit_error:
+        leaf_node = None
+        error = str(limit_error)
+    ending_time = datetime.now()
+    if anytime_writer is not None:
+        anytime_writer.close()
+    actions, record = get_solution_stats(leaf_node, stats)
+    connection.send([actions, starting_time, ending_time, record, error])
+    connection.close()
+
+
+# terminate a job process together with the processes it started, which are in its process group
+def stop_job(worker):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(worker.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):  # the job has not made its group yet
+            pass
+    worker.terminate()
+    worker.join()
+
+
+# run jobs, each a list of the arguments of run_job after the connection, on up to `processes` worker processes at a time;
+# a job still running after `timeout` seconds is terminated. each job gets its own process so
+# that it can be killed, and the results are returned in the order of the jobs (None if timed out).
+# callback(job index, result) is called as soon as each job finishes
+def run_jobs(jobs, timeout = 300, processes = None, callback = None):
+    processes = processes or os.cpu_count()
+    results = [None] * len(jobs)
+    running = {}  # connection -> [job index, worker process, deadline]
+    next_job = 0
+
+    try:
+        while next_job < len(jobs) or running:
+            while next_job < len(jobs) and len(running) < processes:
+                reader, writer = multiprocessing.Pipe(duplex = False)
+                worker = multiprocessing.Process(target = run_job, args = [writer] + list(jobs[next_job]))
+                worker.start()
+                writer.close()
+                running[reader] = [next_job, worker, datetime.now() + timedelta(seconds = timeout)]
+                next_job += 1
+
+            next_deadline = min(deadline for index, worker, deadline in running.values())
+            for reader in wait(list(running), max(0, (next_deadline - datetime.now()).total_seconds())):
+                index, worker, deadline = running.pop(reader)
+                try:
+                    results[index] = reader.recv()
+                except EOFError:  # the worker died without a result
+                    pass
+                reader.close()
+                worker.join()
+                if callback:
+                    callback(index, results[index])
+
+            now = datetime.now()
+            for reader in list(running):
+                index, worker, deadline = running[reader]
+                if now >= deadline:  # kill the runaway search
+                    stop_job(worker)
+                    reader.close()
+                    del running[reader]
+                    if callback:
+                        callback(index, None)
+    finally:  # the jobs left when interrupted are in their own process groups and would keep running
+        for reader, [index, worker, deadline] in running.items():
+            stop_job(worker)
+            reader.close()
+    return results
+
+
+# get the name of the output folder; the default heuristic keeps the folder named after the algorithm
+def get_output_name(algorithm, h_flag = 0):
+    if 'BFS' in algorithm or h_flag == 0:
+        return algorithm
+    return algorithm + '_H' + str(h_flag)
+
+
+# write the process of a finished job, or of a solution read from the cache;
+# return [process, running_time, iseffective]
+def get_job_process(rows, job_result, timeout, cached = False):
+    process = list(rows)
+    if job_result == None:
+        process.append(['Not solved within ' + str(timeout) + 's'])
+        return [process, '', False]
+    [actions, starting_time, ending_time, record, error] = job_result
+    if error != None:
+        process.append([error])
+        return [process, '', False]
+    write_solution(process, actions)
+    if cached:
+        write_cache_hit(process)
+    [running_time, iseffective, effec_solve_num] = calculate_running_time(starting_time, ending_time,
+                                                                          process, 0)
+    return [process, running_time, iseffective]
+
+
+# solve every puzzle of the source (a directory, a glob pattern or a multi-puzzle file) with every
+# (algorithm, h_flag) in parallel. the per-file outputs of main() are written, and a record is appended
+# to batch_results.jsonl, as soon as each job finishes; the total outputs are written in a stable order.
+# with instrument, each job also writes its _stats.json as main() does; with a cache_path, the puzzles
+# found in the SolutionCache there get no job and the solutions of the jobs are added to it
+def batch_main(source, algorithms, h_flags = (0,), timeout = 300, processes = None, instrument = False,
+               cache_path = None):
+    path = get_puzzle_source(source)[0]
+    puzzles = []
+    layouts = []  # [shape, goal_state] of each puzzle
+    pattern_dims = []  # the size of each puzzle the pattern database applies to, or None
+    for file, shape, initial_state, rows, goal_state in read_puzzles(source):
+        process = [[row] for row in rows]
+        puzzle = Puzzle(initial_state, shape, goal_state)
+        solvable = puzzle.is_solvable()
+        write_solvability(process, solvable)
+        puzzles.append([file, process, initial_state, solvable])
+        layouts.append([shape, goal_state])
+        pattern_dims.append(shape[0] if puzzle.has_pattern_database() else None)
+    cache = None if cache_path is None else SolutionCache(cache_path)
+
+    # unsolvable and cached puzzles, and puzzles the pattern database does not apply to, get no job
+    jobs = []
+    job_runs = []  # [run index, puzzle index] of each job
+    pdb_dims = set()  # the board sizes of the jobs that use the pattern database
+    runs = []  # [algorithm, h_flag] of each group of jobs
+    cache_hits = []  # [run index, puzzle index, job result] of each cached puzzle
+    rejected = []  # [run index, puzzle index, job result] of each puzzle its heuristic does not apply to
+    for algorithm in algorithms:
+        for h_flag in ([0] if 'BFS' in algorithm else h_flags):
+            runs.append([algorithm, h_flag])
+            name = get_output_name(algorithm, h_flag)
+            if not os.path.exists(path + '/' + name):
+                os.mkdir(path + '/' + name)
+            for i, [file, rows, initial_state, solvable] in enumerate(puzzles):
+                if solvable and cache is not None:
+                    starting_time = datetime.now()
+                    actions = cache.get(initial_state, algorithm, h_flag, *layouts[i][0], layouts[i][1])
+                    if actions is not None:
+                        cache_hits.append([len(runs) - 1, i, [actions, starting_time, datetime.now(), None, None]])
+                        continue
+                if solvable and uses_pattern_database(algorithm, h_flag):
+                    if pattern_dims[i] is None:
+                        now = datetime.now()
+                        rejected.append([len(runs) - 1, i, [None, now, now, None, PATTERN_DATABASE_ERROR]])
+                        continue
+                    pdb_dims.add(pattern_dims[i])
+                if solvable:
+                    job_runs.append([len(runs) - 1, i])
+                    anytime_path = path + '/' + name + '/' + name + '_anytime.jsonl' if algorithm == 'ARASTAR' else None
+                    jobs.append([initial_state, algorithm, h_flag, instrument, True, anytime_path, file] + layouts[i])
+    totals = [[[file, '', False] for file, rows, initial_state, solvable in puzzles] for run in runs]
+
+    writer = ResultWriter(path + '/batch_results.jsonl',
+                          ['file', 'algorithm', 'h_flag', 'steps', 'running_time', 'iseffective', 'cached'])
+
+    def write_result(r, i, job_result, cached = False):
+        algorithm, h_flag = runs[r]
+        name = get_output_name(algorithm, h_flag)
+        file, rows, initial_state, solvable = puzzles[i]
+        [process, running_time, iseffective] = get_job_process(rows, job_result, timeout, cached)
+        write_process(file, process, path + '/' + name, name)
+        if job_result != None and job_result[3] != None:
+            write_stats(file, job_result[3], path + '/' + name, name)
+        if cache is not None and not cached and job_result != None and job_result[0] != None:
+            cache.put(initial_state, algorithm, h_flag, job_result[0], *layouts[i][0], layouts[i][1])
+        totals[r][i] = [file, running_time, iseffective]
+        steps = None if job_result == None or job_result[4] != None else len(job_result[0] or [])
+        writer.write([file, algorithm, h_flag, steps, float(running_time) if running_time else None, iseffective,
+                      cached])
+
+    def write_job(index, job_result):
+        r, i = job_runs[index]
+        write_result(r, i, job_result)
+
+    for r, i, job_result in cache_hits:
+        write_result(r, i, job_result, cached = True)
+    for r, i, job_result in rejected:
+        write_result(r, i, job_result)
+    # build the missing pattern database tables once here instead of in every job that needs them
+    for dim in sorted(pdb_dims):
+        get_pattern_database(dim)
+    print('Running ' + str(len(jobs)) + ' jobs on ' + str(processes or os.cpu_count()) + ' processes')
+    try:
+        run_jobs(jobs, timeout, processes, write_job)
+    finally:
+        writer.close()
+        if cache is not None:
+            cache.save()
+
+    for r, [algorithm, h_flag] in enumerate(runs):
+        name = get_output_name(algorithm, h_flag)
+        for i, [file, rows, initial_state, solvable] in enumerate(puzzles):
+            if not solvable:
+                write_process(file, rows, path + '/' + name, name)
+        effec_solve_num = sum(1 for file, running_time, iseffective in totals[r] if iseffective)
+        print(name + ': effectively solved ' + str(effec_solve_num) + ' of ' + str(len(puzzles)) + ' puzzles')
+        write_process('total', [['file', 'running_time(s)', 'iseffective']] + totals[r], path + '/' + name, name)
 
 
 # In[19]:
@@ -400,10 +1529,6 @@ def main(algorithm, h_flag = 0):
 input_file_path = r'./SlidingBlocks/examples/moderate'
 algorithms = ['BFS', 'ASTAR', 'IDASTAR']
 
-# run the program to get the results
-for algorithm in algorithms:
-    print('----------------------------------')
-    print('Implementing ' + algorithm)
-    print('----------------------------------')
-    main(algorithm, 0)
-
+# run the program to get the results; every (puzzle, algorithm) job runs in parallel
+if __name__ == '__main__':
+    batch_main(input_file_path, algorithms, [0])
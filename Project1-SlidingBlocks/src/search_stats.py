@@ -0,0 +1,71 @@
+import json
+import tracemalloc
+from datetime import datetime
+
+
+class SearchStats(object):
+    # counters of one search run. the searches take an optional stats argument and only touch it
+    # once per expanded node, so a run without stats pays a single `is not None` test per node
+    def __init__(self, trace_memory = True):
+        self.expanded = 0  # nodes whose successors were generated
+        self.generated = 0  # successors of the expanded nodes
+        self.duplicates = 0  # generated states that were already open or closed
+        self.open_peak = 0  # largest open list (IDA*: deepest DFS stack)
+        self.closed_peak = 0  # largest closed set
+        self.iterations = 0  # IDA* iterations
+        self.thresholds = []  # IDA* f-limit of each iteration
+        self.phases = {}  # phase name -> seconds
+        self.peak_memory = None  # bytes, from tracemalloc
+        self.trace_memory = trace_memory
+        self.phase_name = None
+        self.phase_start = None
+        self.tracing = False
+
+    def update_open(self, size):
+        if size > self.open_peak:
+            self.open_peak = size
+
+    # start timing a phase; the running phase, if any, ends here
+    def start_phase(self, name):
+        self.end_phase()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+        self.phase_name = name
+        self.phase_start = datetime.now()
+
+    def end_phase(self):
+        if self.phase_name is None:
+            return
+        seconds = (datetime.now() - self.phase_start).total_seconds()
+        self.phases[self.phase_name] = self.phases.get(self.phase_name, 0) + seconds
+        self.phase_name = None
+
+    # end the running phase and read the peak memory of the run
+    def stop(self):
+        self.end_phase()
+        if self.tracing:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.tracing = False
+
+    def get_record(self):
+        search_time = self.phases.get('search')
+        return {
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'duplicates': self.duplicates,
+            'open_peak': self.open_peak,
+            'closed_peak': self.closed_peak,
+            'iterations': self.iterations,
+            'thresholds': self.thresholds,
+            'nodes_per_second': round(self.expanded / search_time) if search_time and self.expanded else None,
+            'peak_memory': self.peak_memory,
+            'phases': self.phases,
+        }
+
+
+# write the record of a run next to its _result.csv
+def write_stats(file, record, path, algorithm):
+    with open(path + '/' + algorithm + '_' + file + '_stats.json', 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent = 2)
@@ -0,0 +1,116 @@
+import os
+import json
+from collections import OrderedDict
+
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'SlidingBlocks', 'solution_cache.json')
+# the move of the blank space of each action as (row, column) steps
+DIRECTIONS = {'UP': (-1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1), 'DOWN': (1, 0)}
+
+
+# get the symmetries of a rows*columns board as functions (row, column) -> (row, column); a square board
+# has the 8 rotations and reflections, any other board the 4 that keep its shape
+def get_symmetries(rows, columns):
+    symmetries = [
+        lambda r, c: (r, c),
+        lambda r, c: (rows - 1 - r, c),
+        lambda r, c: (r, columns - 1 - c),
+        lambda r, c: (rows - 1 - r, columns - 1 - c),
+    ]
+    if rows == columns:
+        symmetries += [
+            lambda r, c: (c, r),
+            lambda r, c: (columns - 1 - c, rows - 1 - r),
+            lambda r, c: (c, rows - 1 - r),
+            lambda r, c: (columns - 1 - c, r),
+        ]
+    return symmetries
+
+
+# move the tiles of a state to their cells under a symmetry
+def transform_state(state, symmetry, rows, columns):
+    next_state = [0] * len(state)
+    for cell, tile in enumerate(state):
+        r, c = symmetry(*divmod(cell, columns))
+        next_state[r * columns + c] = tile
+    return next_state
+
+
+# get the action of each action once the board is transformed by a symmetry
+def get_action_map(symmetry):
+    origin = symmetry(0, 0)
+    actions = {step: action for action, step in DIRECTIONS.items()}
+    action_map = {}
+    for action, (dr, dc) in DIRECTIONS.items():
+        r, c = symmetry(dr, dc)
+        action_map[action] = actions[(r - origin[0], c - origin[1])]
+    return action_map
+
+
+# get the key of a puzzle: the goal cell of the tile in each cell and the cell of the blank space,
+# so that puzzles which differ only by the labels of their tiles share a key
+def get_key(state, goal_state, rows, columns, algorithm, h_flag):
+    goal_cells = [0] * len(goal_state)
+    for cell, tile in enumerate(goal_state):
+        goal_cells[tile] = cell
+    bits = max(4, (len(state) - 1).bit_length())
+    code = 0
+    for tile in reversed(state):
+        code = (code << bits) | goal_cells[tile]
+    return (str(rows) + 'x' + str(columns) + ':' + str(state.index(0)) + ':' + format(code, 'x') + ':' +
+            algorithm + ':' + str(h_flag))
+
+
+class SolutionCache(object):
+    # on-disk cache of solutions by puzzle, algorithm and heuristic, with the least recently used
+    # entries evicted beyond max_entries. a puzzle is also looked up as its transposes and reflections
+    # (the goal state transformed as well), and the cached actions are mapped back to its board
+    def __init__(self, path = CACHE_PATH, max_entries = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> actions, the least recently used first
+        self.changed = False
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = OrderedDict(json.load(f))
+
+    def __len__(self):
+        return len(self.entries)
+
+    # get the actions that solve the state, or None if neither the state nor a symmetric one is cached
+    def get(self, state, algorithm, h_flag, rows, columns = None, goal_state = None):
+        columns = columns or rows
+        goal_state = goal_state or list(range(len(state)))
+        for symmetry in get_symmetries(rows, columns):
+            key = get_key(transform_state(state, symmetry, rows, columns),
+                          transform_state(goal_state, symmetry, rows, columns),
+                          rows, columns, algorithm, h_flag)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.changed = True
+                action_map = {action: next_action for next_action, action in get_action_map(symmetry).items()}
+                return [action_map[action] for action in self.entries[key]]
+        return None
+
+    def put(self, state, algorithm, h_flag, actions, rows, columns = None, goal_state = None):
+        columns = columns or rows
+        goal_state = goal_state or list(range(len(state)))
+        key = get_key(state, goal_state, rows, columns, algorithm, h_flag)
+        self.entries[key] = list(actions)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+        self.changed = True
+
+    # write the cache if it changed; a temporary file keeps the old cache whole until it is replaced
+    def save(self):
+        if not self.changed:
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(self.path + '.tmp', self.path)
+        self.changed = False
@@ -0,0 +1,24 @@
+import os
+import pytest
+from program import solve, read_puzzle_blocks, SearchLimitError
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SlidingBlocks', 'examples')
+
+
+def read_example(level, name):
+    shape, initial_state, rows, goal_state = next(read_puzzle_blocks(os.path.join(EXAMPLES, level, name)))
+    return initial_state
+
+
+# SMA* must give up on a budget just below the one its solution needs instead of regenerating
+# the same subtrees forever; 3x3_4 has an optimal solution of 27 steps
+@pytest.mark.parametrize('max_nodes', [10, 20, 28, 29])
+def test_sma_star_too_small_budget(max_nodes):
+    with pytest.raises(SearchLimitError):
+        solve(read_example('difficult', '3x3_4'), 'SMASTAR', max_nodes = max_nodes)
+
+
+@pytest.mark.parametrize('max_nodes', [30, 40])
+def test_sma_star_small_budget(max_nodes):
+    assert solve(read_example('difficult', '3x3_4'), 'SMASTAR', max_nodes = max_nodes).depth == 27
@@ -0,0 +1,172 @@
+import os
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from time import perf_counter
+from mancala import Mancala
+
+
+ENDGAME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame.db')
+HEADER = struct.Struct('<4sII')  # magic, pits on each side, maximum number of stones in the pits
+MAGIC = b'MNCL'
+UNKNOWN = -128
+
+
+# binomial coefficients up to n
+def get_binomials(n):
+    binomials = [[0] * (n + 1) for _ in range(n + 1)]
+    for i in range(n + 1):
+        binomials[i][0] = 1
+        for j in range(1, i + 1):
+            binomials[i][j] = binomials[i - 1][j - 1] + binomials[i - 1][j]
+    return binomials
+
+
+class PositionIndex(object):
+    # a dense index of the ways to put at most max_stones stones into `pits` pits: the positions with
+    # fewer stones come first, and the positions with the same number of stones are in lexicographic order
+    def __init__(self, pits = 12, max_stones = 10):
+        self.pits = pits
+        self.max_stones = max_stones
+        self.binomials = get_binomials(pits + max_stones + 1)
+        self.size = self.binomials[max_stones + pits][pits]
+
+    def get_index(self, pits):
+        binomials = self.binomials
+        remaining = sum(pits)
+        k = self.pits
+        index = binomials[remaining - 1 + k][k] if remaining else 0  # the positions with fewer stones
+        for stones in pits:
+            k -= 1
+            if stones:
+                # the positions with fewer stones in this pit and the same ones before it
+                index += binomials[remaining + k][k] - binomials[remaining - stones + k][k]
+                remaining -= stones
+        return index
+
+
+class EndgameBuilder(object):
+    # compute the value of every position with at most max_stones stones in the pits: the most stones the player
+    # to move can still add to its store minus the most the opponent can, with both playing perfectly. the stores
+    # do not matter, so a position is the pits of the player to move followed by the pits of the opponent.
+    # the stones in the pits never increase, and a move that does not reach the store only moves stones towards
+    # it on the side of the player, so every move leads to a position with fewer stones or one closer to the
+    # stores; the recursion below therefore never meets a position twice on one line of play
+    def __init__(self, numPit = 6, max_stones = 10):
+        self.numPit = numPit
+        self.index = PositionIndex(2 * numPit, max_stones)
+        self.values = array('b', [UNKNOWN]) * self.index.size
+        self.game = Mancala(numPit)
+
+    def get_value(self, state):
+        # state = 14 elements with empty stores and the player to move as player1
+        numPit = self.numPit
+        pits = state[:numPit] + state[numPit + 1:-1]
+        if not any(state[:numPit]) or not any(state[numPit + 1:-1]):
+            return 0
+        index = self.index.get_index(pits)
+        if self.values[index] != UNKNOWN:
+            return self.values[index]
+
+        value = -self.index.max_stones - 1
+        for move in range(numPit):
+            if state[move] == 0:
+                continue
+            child = list(state)
+            self.game.state = child
+            extra_turn = self.game.make_move(1, move)[4]
+            gain = child[numPit]
+            child[numPit] = 0
+            if extra_turn:
+                value = max(value, gain + self.get_value(child))
+            else:
+                value = max(value, gain - self.get_value(child[numPit + 1:-1] + [0] + child[:numPit] + [0]))
+        self.values[index] = value
+        return value
+
+    def build(self):
+        # walk over every position of the index
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 100 * self.index.max_stones + 1000))
+        numPit = self.numPit
+        for total in range(self.index.max_stones + 1):
+            for pits in get_positions(2 * numPit, total):
+                self.get_value(list(pits[:numPit]) + [0] + list(pits[numPit:]) + [0])
+
+    def save(self, path = ENDGAME_PATH):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.numPit, self.index.max_stones))
+            self.values.tofile(f)
+        os.replace(path + '.tmp', path)
+
+
+# the ways to put `total` stones into `pits` pits
+def get_positions(pits, total):
+    if pits == 1:
+        yield (total,)
+        return
+    for stones in range(total + 1):
+        for rest in get_positions(pits - 1, total - stones):
+            yield (stones,) + rest
+
+
+class EndgameDatabase(object):
+    # the values of an EndgameBuilder, memory-mapped from its file so that all the processes share one copy
+    def __init__(self, path = ENDGAME_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, self.numPit, self.max_stones = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise ValueError(path + ' is not an endgame database')
+        self.index = PositionIndex(2 * self.numPit, self.max_stones)
+        self.values = memoryview(self.mmap)[HEADER.size:].cast('b')
+        self.stores = [None, self.numPit, 2 * self.numPit + 1]
+        self.hits = 0
+
+    def get_value(self, game, index):
+        # get the final store difference of the player with this index to move (own store minus the opponent's)
+        # with perfect play, or None if there are too many stones in the pits
+        state = game.state
+        numPit = self.numPit
+        if game.numPit != numPit or sum(state) - state[numPit] - state[-1] > self.max_stones:
+            return None
+        if index == 1:
+            pits = state[:numPit] + state[numPit + 1:-1]
+        else:
+            pits = state[numPit + 1:-1] + state[:numPit]
+        self.hits += 1
+        store = self.stores[index]
+        return state[store] - state[self.stores[3 - index]] + self.values[self.index.get_index(pits)]
+
+
+# load the endgame database of a path, None if it was not built
+def load_endgame_database(path = ENDGAME_PATH):
+    if path is None or not os.path.exists(path):
+        return None
+    return EndgameDatabase(path)
+
+
+if __name__ == '__main__':
+    # > python endgame.py --stones 10
+    parser = argparse.ArgumentParser(description = 'Build the Mancala endgame database')
+    parser.add_argument("--stones",
+                        type = int,
+                        help = "the most stones left in the pits of a position in the database",
+                        default = 10)
+    parser.add_argument("--pits",
+                        type = int,
+                        help = "pits on each side",
+                        default = 6)
+    parser.add_argument("--output",
+                        type = str,
+                        help = "path of the database",
+                        default = ENDGAME_PATH)
+    args = parser.parse_args()
+
+    starting_time = perf_counter()
+    builder = EndgameBuilder(args.pits, args.stones)
+    builder.build()
+    builder.save(args.output)
+    print(f"{builder.index.size} positions written to {args.output} in {perf_counter() - starting_time:.2f}s")
@@ -0,0 +1,69 @@
+import os
+import json
+
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weights.json')
+# every feature is the value of the player to move minus the value of the opponent
+FEATURES = [
+    'store',        # stones in the store
+    'stones',       # stones in the pits
+    'capture',      # stones the best capture of the next move would take
+    'extra_turns',  # pits whose last stone would be sowed into the store
+    'mobility',     # pits with stones, i.e. legal moves
+]
+# the weights of the store difference alone, which is what score() gives an unfinished game
+STORE_WEIGHTS = [1, 0, 0, 0, 0]
+
+
+# get the features of a state with the player of this index to move, in the order of FEATURES
+def get_features(state, index, numPit = 6):
+    p1 = get_side_features(state, 0, numPit)
+    p2 = get_side_features(state, numPit + 1, numPit)
+    own, opp = (p1, p2) if index == 1 else (p2, p1)
+    return [own[i] - opp[i] for i in range(len(FEATURES))]
+
+
+# get the features of one side, whose pits start at offset and are followed by its store; one pass over its pits
+def get_side_features(state, offset, numPit):
+    cycle = 2 * numPit + 1
+    stones = 0
+    capture = 0
+    extra_turns = 0
+    mobility = 0
+    for pit in range(numPit):
+        count = state[offset + pit]
+        if count == 0:
+            continue
+        stones += count
+        mobility += 1
+        last_pit = (pit + count) % cycle
+        if last_pit == numPit:
+            extra_turns += 1
+        elif count < cycle and last_pit < numPit and state[offset + last_pit] == 0:
+            capture = max(capture, 1 + state[2 * numPit - offset - last_pit])  # and the opposite pit
+    return [state[offset + numPit], stones, capture, extra_turns, mobility]
+
+
+class LinearEvaluation(object):
+    # the score of an unfinished game as a weighted sum of FEATURES, for the player to move
+    def __init__(self, weights = STORE_WEIGHTS):
+        if len(weights) != len(FEATURES):
+            raise ValueError('expected ' + str(len(FEATURES)) + ' weights, got ' + str(len(weights)))
+        self.weights = list(weights)
+
+    def evaluate(self, game, index):
+        features = get_features(game.state, index, game.numPit)
+        return sum(weight * feature for weight, feature in zip(self.weights, features))
+
+    def save(self, path = WEIGHTS_PATH):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(zip(FEATURES, self.weights)), f, indent = 2)
+
+
+# load the evaluation saved in a path, None if there is no path
+def load_evaluation(path = WEIGHTS_PATH):
+    if path is None:
+        return None
+    with open(path, encoding='utf-8') as f:
+        weights = json.load(f)
+    return LinearEvaluation([weights[feature] for feature in FEATURES])
@@ -2,9 +2,10 @@ from mancala import *
 from player import *
 import time
 
-def p1_VS_p2(p1, p2, e_n = 1, depth1 = 6, depth2 = 6, show_flag = False):
-    player1 = Player(1, p1, depth1)
-    player2 = Player(2, p2, depth2)
+def p1_VS_p2(p1, p2, e_n = 1, depth1 = 6, depth2 = 6, show_flag = False, time1 = None, time2 = None):
+    # time1, time2 = seconds per move of an alphabeta player, which then searches up to depth1/depth2
+    player1 = Player(1, p1, depth1, time_limit = time1)
+    player2 = Player(2, p2, depth2, time_limit = time2)
     mgame = Mancala()
     records = {p1: 0, p2: 0, 'draw': 0} if p1 != p2 else {p1 + '_1': 0, p2 + '_2': 0, 'draw': 0}
 
@@ -24,6 +25,8 @@ def p1_VS_p2(p1, p2, e_n = 1, depth1 = 6, depth2 = 6, show_flag = False):
         player2.reset()
         mgame.reset()
     end_time = time.time()
+    player1.close()
+    player2.close()
     return records, (end_time - start_time)
 
 mgame = Mancala()
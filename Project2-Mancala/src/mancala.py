@@ -1,3 +1,6 @@
+from time import perf_counter
+
+
 class Mancala(object):
     
     def __init__(self, m = 6, k = 4, state = None):
@@ -8,11 +11,32 @@ class Mancala(object):
             self.state = state # a list of 14 elements
         else:
             self.state = self.generate_init_state()
+        # the index of the store of each player, indexed by player.index
+        self.stores = [None, self.numPit, 2 * self.numPit + 1]
+        # the next and previous pit of each pit when a player sows, skipping the opponent's store
+        self.next_pits = [None, self.get_sowing_order(1), self.get_sowing_order(2)]
+        self.prev_pits = [None, [0] * len(self.state), [0] * len(self.state)]
+        for index in (1, 2):
+            for pit, next_pit in enumerate(self.next_pits[index]):
+                if next_pit is not None:
+                    self.prev_pits[index][next_pit] = pit
     
     def generate_init_state(self):
         # generate the initial state
         return [self.stonesInPit] * self.numPit + [0] + [self.stonesInPit] * self.numPit + [0] # list
 
+    def get_sowing_order(self, index):
+        # get the next pit of each pit when the player sows, None for the opponent's store
+        size = 2 * self.numPit + 2
+        opp_store = self.stores[3 - index]
+        next_pits = []
+        for pit in range(size):
+            next_pit = (pit + 1) % size
+            if next_pit == opp_store:
+                next_pit = (next_pit + 1) % size
+            next_pits.append(None if pit == opp_store else next_pit)
+        return next_pits
+
     def reset(self):
         # reset the environment
         self.ready_player = 1
@@ -64,11 +88,15 @@ class Mancala(object):
 
     def filter_actions(self, player):
         # get only the legal actions -> list of indexes of pits that have stones
-        pits = self.p_pits(player.index)
+        return self.get_actions(player.index)
+
+    def get_actions(self, index):
+        # get the legal actions of the player with this index
+        pits = self.p_pits(index)
         actions = []
-        for index, value in enumerate(pits):
+        for pit, value in enumerate(pits):
             if value > 0:
-                actions.append(index)            
+                actions.append(pit)
         return actions
 
     def show_board(self):
@@ -138,63 +166,73 @@ class Mancala(object):
             return False
         return True
 
-    def sowing(self, player, move):
-        # update the board state with a new move
-        
-        init_pit = move
-        stones = self.p_pits(player.index)[init_pit]
-        curr_len = 2 * self.numPit + 1 # 13 available pits for each player
-
-        if player.index == 1: # player1
-            curr_state = self.state[:-1] 
-        else: # player2
-            curr_state = self.p2_pits() + [self.p2_store()] + self.p1_pits() 
-
-        per_add = stones // curr_len # the number of complete circles where the active player can go through every available pit
-        dis_pit = stones % curr_len # the distance between the chose pit and the pit where the last stone is
-        curr_state[init_pit] = 0 # remove all the stones in the chosen pit
-        last_pit = (init_pit + dis_pit) % curr_len # the index of the pit where the last stone is
-        # update the board state
-        new_state = [i + per_add for i in curr_state] 
-        if last_pit > init_pit:
-            for index, value in enumerate(new_state):
-                if init_pit < index <= last_pit:
-                    new_state[index] = value + 1  
-        elif last_pit < init_pit:
-            for index, value in enumerate(new_state):
-                if init_pit < index or index <= last_pit:
-                    new_state[index] = value + 1  
-        else: # reach one or more complete circles
-            pass 
-
-        if player.index == 1: # player1
-            return new_state + [self.p2_store()], last_pit
-        else: # player2
-            return new_state[-self.numPit:] + [self.p1_store()] + new_state[:-self.numPit], last_pit
-
     def turn_taking(self, player, move):        
         # return True if it is still the active player's turn; 
         # otherwise, return False to change the player
 
-        self.state, last_pit = self.sowing(player, move)
-        if last_pit == self.numPit:
+        return self.make_move(player.index, move)[4]
+
+    def is_extra_turn(self, index, move):
+        # check whether the last stone of the move is sowed into the store of the player
+        stones = self.state[self.stores[index] - self.numPit + move]
+        return stones > 0 and stones % (2 * self.numPit + 1) == self.numPit - move
+
+    def get_capture(self, index, move):
+        # get the number of stones the move captures, 0 if it captures none; moves that go round
+        # the whole board are counted as no capture
+        offset = self.stores[index] - self.numPit
+        stones = self.state[offset + move]
+        last_pit = (move + stones) % (2 * self.numPit + 1)
+        if stones > 2 * self.numPit or last_pit >= self.numPit or self.state[offset + last_pit] != 0:
+            return 0
+        return 1 + self.state[2 * self.numPit - offset - last_pit]
+
+    def make_move(self, index, move):
+        # sow the stones of a pit of the player with this index in place, and return the record
+        # to undo it: (pit, stones, last pit, captured stones or -1, extra turn)
+        state = self.state
+        next_pits = self.next_pits[index]
+        pit = move if index == 1 else move + self.numPit + 1
+        stones = state[pit]
+        state[pit] = 0
+        last_pit = pit
+        for _ in range(stones):
+            last_pit = next_pits[last_pit]
+            state[last_pit] += 1
+        store = self.stores[index]
+        if last_pit == store:
             # if the last stone is sowed into the store,
             # the active player can take another turn
-            return True
-        if last_pit < self.numPit and self.p_pits(player.index)[last_pit] == 1:
+            return pit, stones, last_pit, -1, True
+        if store - self.numPit <= last_pit < store and state[last_pit] == 1:
             # if the last stone is sowed into an empty pits on the active player’s side, 
-            # and there are some stones in the opposite pit,
-            # the stones in these two pits will be captured in the active player’s store
-            opp_last_pit = self.numPit - 1 - last_pit
-            self.update_store(self.p_store(player.index) + 1
-                              + self.p_pits(player.opp_index)[opp_last_pit], player.index)
+            # the stones in this pit and the opposite pit will be captured in the active player’s store
+            opp_last_pit = 2 * self.numPit - last_pit
+            captured = state[opp_last_pit]
+            state[store] += 1 + captured
             # empty two pits
-            self.update_pit(0, last_pit, player.index)
-            self.update_pit(0, opp_last_pit, player.opp_index)
-        return False
+            state[last_pit] = 0
+            state[opp_last_pit] = 0
+            return pit, stones, last_pit, captured, False
+        return pit, stones, last_pit, -1, False
 
-    def play_game(self, player1, player2, show_flag = True):
+    def unmake_move(self, index, record):
+        # restore the state before make_move(index, move) from the record it returned
+        pit, stones, last_pit, captured, extra = record
+        state = self.state
+        if captured >= 0:
+            state[self.stores[index]] -= 1 + captured
+            state[last_pit] = 1
+            state[2 * self.numPit - last_pit] = captured
+        prev_pits = self.prev_pits[index]
+        for _ in range(stones):
+            state[last_pit] -= 1
+            last_pit = prev_pits[last_pit]
+        state[pit] = stones
+
+    def play_game(self, player1, player2, show_flag = True, move_times = None):
         # main function -> start the game
+        # move_times = {1: [], 2: []} to collect the seconds each player takes per move
         players = [player1, player2]
         player = players[self.ready_player - 1] # player1 starts the game
 
@@ -208,7 +246,7 @@ class Mancala(object):
             if show_flag == True:
                 print(f"Player {player.index}:")
                 
-            move = player.get_move(self)
+            move = self.get_timed_move(player, move_times)
             if show_flag == True:
                 print(f'{player.algorithm} player choice: {move}')
             moves = [move]
@@ -216,10 +254,19 @@ class Mancala(object):
             while self.turn_taking(player, move): # check if it is the time to change the active player
                 if self.check_end_game():
                     return self.end_game(show_flag)
-                move = player.get_move(self)
+                move = self.get_timed_move(player, move_times)
                 if show_flag == True:
                     print(f'{player.algorithm} player choice: {move}')
                 moves.append(move)                
             if show_flag == True:
                 self.show_board()
             player = players[player.opp_index - 1] # change the active player
+
+    def get_timed_move(self, player, move_times = None):
+        # get the move of the player, adding the seconds it takes to move_times[player.index]
+        if move_times is None:
+            return player.get_move(self)
+        starting_time = perf_counter()
+        move = player.get_move(self)
+        move_times[player.index].append(perf_counter() - starting_time)
+        return move
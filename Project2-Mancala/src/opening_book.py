@@ -0,0 +1,159 @@
+import os
+import struct
+import argparse
+from time import perf_counter
+from multiprocessing import Pool
+from mancala import Mancala
+from player import Player
+from endgame import ENDGAME_PATH, load_endgame_database
+
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+HEADER = struct.Struct('<4sBBI')  # magic, pits on each side, stones in a pit at the start, number of entries
+MAGIC = b'MNCB'
+
+
+# get the key of a position: the stones in every pit and store, then the player to move, one byte each
+def get_key(state, index):
+    return bytes(state) + bytes((index,))
+
+
+# get the positions reached in at most `plies` moves from the start of the game, both players trying every move;
+# return [state, player to move] lists of the unfinished ones in the order they are first reached
+def get_book_positions(game, plies):
+    positions = {}
+    frontier = [[list(game.state), 1]]
+    for ply in range(plies + 1):
+        next_frontier = []
+        for state, index in frontier:
+            key = get_key(state, index)
+            game.state = list(state)
+            if key in positions or game.check_end_game():
+                continue
+            positions[key] = [state, index]
+            if ply == plies:
+                continue
+            for move in game.get_actions(index):
+                record = game.make_move(index, move)
+                next_frontier.append([list(game.state), index if record[4] else 3 - index])
+                game.unmake_move(index, record)
+        frontier = next_frontier
+    return list(positions.values())
+
+
+# ## Workers
+
+# every worker process keeps its board and one player per side, with their transposition tables
+worker_game = None
+worker_players = {}
+
+
+def init_worker(numPit, stones, depth, time_limit, h_choice, endgame_path):
+    global worker_game
+    worker_game = Mancala(numPit, stones)
+    endgame = load_endgame_database(endgame_path)
+    for index in (1, 2):
+        worker_players[index] = Player(index, 'alphabeta', depth, time_limit, h_choice, endgame)
+
+
+def search_position(job):
+    state, index = job
+    worker_game.state = list(state)
+    player = worker_players[index]
+    player.reset() # a fresh search, so that the book does not depend on the order of the searches
+    return [state, index, player.get_move(worker_game)]
+
+
+class OpeningBook(object):
+    # the best move of every position of the first plies of the game, searched offline
+    def __init__(self, numPit = 6, stones = 4, moves = None):
+        self.numPit = numPit
+        self.stones = stones
+        self.moves = moves or {}  # key -> move
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.moves)
+
+    def get_move(self, game, index):
+        # get the book move of the player with this index, None if the position is not in the book
+        if game.numPit != self.numPit or game.stonesInPit != self.stones:
+            return None
+        move = self.moves.get(get_key(game.state, index))
+        if move is not None:
+            self.hits += 1
+        return move
+
+    # search the positions of the first `plies` moves with an alphabeta player on `processes` worker processes
+    def build(self, plies = 4, depth = 10, time_limit = None, h_choice = 0, endgame_path = None, processes = None):
+        game = Mancala(self.numPit, self.stones)
+        positions = get_book_positions(game, plies)
+        with Pool(processes or os.cpu_count(), initializer = init_worker,
+                  initargs = (self.numPit, self.stones, depth, time_limit, h_choice, endgame_path)) as pool:
+            for state, index, move in pool.imap_unordered(search_position, positions):
+                self.moves[get_key(state, index)] = move
+
+    def save(self, path = BOOK_PATH):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.numPit, self.stones, len(self.moves)))
+            for key in sorted(self.moves):
+                f.write(key + bytes((self.moves[key],)))
+        os.replace(path + '.tmp', path)
+
+
+# load the opening book of a path, None if it was not built
+def load_opening_book(path = BOOK_PATH):
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, numPit, stones, entries = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(path + ' is not an opening book')
+    size = 2 * numPit + 4  # the pits and stores, the player to move and the move
+    moves = {}
+    for offset in range(HEADER.size, HEADER.size + entries * size, size):
+        moves[data[offset:offset + size - 1]] = data[offset + size - 1]
+    return OpeningBook(numPit, stones, moves)
+
+
+if __name__ == '__main__':
+    # > python opening_book.py --plies 4 --depth 10
+    parser = argparse.ArgumentParser(description = 'Build the Mancala opening book')
+    parser.add_argument("--plies",
+                        type = int,
+                        help = "moves from the start of the game covered by the book",
+                        default = 4)
+    parser.add_argument("--depth",
+                        type = int,
+                        help = "maximum depth of the search of every position",
+                        default = 10)
+    parser.add_argument("--time",
+                        type = float,
+                        help = "seconds to search every position, no limit by default",
+                        default = None)
+    parser.add_argument("--h_choice",
+                        type = int,
+                        help = "scoring of a finished game",
+                        default = 0)
+    parser.add_argument("--endgame",
+                        type = str,
+                        nargs = '?',
+                        help = "endgame database the searches look positions with few stones up in",
+                        const = ENDGAME_PATH,
+                        default = None)
+    parser.add_argument("--processes",
+                        type = int,
+                        help = "worker processes, all the cores by default",
+                        default = None)
+    parser.add_argument("--output",
+                        type = str,
+                        help = "path of the book",
+                        default = BOOK_PATH)
+    args = parser.parse_args()
+
+    starting_time = perf_counter()
+    book = OpeningBook()
+    book.build(args.plies, args.depth, args.time, args.h_choice, args.endgame, args.processes)
+    book.save(args.output)
+    print(f"{len(book)} positions written to {args.output} in {perf_counter() - starting_time:.2f}s")
@@ -0,0 +1,129 @@
+import os
+from time import perf_counter
+from multiprocessing import Pool, Value
+from mancala import Mancala
+from search_control import SearchTimeout
+from endgame import load_endgame_database
+
+
+# every worker process keeps its boards, its players, with their transposition tables, and its endgame databases
+# for all the moves
+worker_games = {}
+worker_players = {}
+worker_endgames = {}
+shared_alpha = None
+
+
+def init_worker(alpha):
+    global shared_alpha
+    shared_alpha = alpha
+
+
+def get_worker_player(index, h_choice, endgame_path, evaluation, game):
+    from player import Player # player imports this module
+    key = (index, h_choice, endgame_path, evaluation and tuple(evaluation.weights))
+    if key not in worker_players:
+        if endgame_path not in worker_endgames:
+            worker_endgames[endgame_path] = load_endgame_database(endgame_path)
+        worker_players[key] = Player(index, 'alphabeta', h_choice = h_choice, endgame = worker_endgames[endgame_path],
+                                     evaluation = evaluation)
+    player = worker_players[key]
+    player.init_search(game)
+    return player
+
+
+# search one root move to depth plies with the window (shared alpha, inf); return [move, its value or None
+# if the time ran out, positions cut off by the depth limit, the alpha it was searched with]. a value that is
+# not above that alpha is only an upper bound of the value of the move
+def search_move(job):
+    numPit, state, index, move, depth, time_limit, h_choice, endgame_path, evaluation = job
+    if numPit not in worker_games:
+        worker_games[numPit] = Mancala(numPit, state = list(state))
+    game = worker_games[numPit]
+    game.state[:] = state
+    player = get_worker_player(index, h_choice, endgame_path, evaluation, game)
+    player.table.new_search()
+    control = player.control
+    control.deadline = None if time_limit is None else perf_counter() + time_limit
+    control.start_iteration()
+    control.follow_pv = False
+
+    alpha = shared_alpha.value
+    record = game.make_move(index, move)
+    try:
+        if record[4]: # extra turn
+            value = player.negamax(game, index, depth - 1, 1, True, alpha, float("inf"))[0]
+        else:
+            value = -player.negamax(game, 3 - index, depth - 1, 1, True, float("-inf"), -alpha)[0]
+    except SearchTimeout:
+        return [move, None, control.horizon, alpha]
+    finally:
+        game.state[:] = state
+    with shared_alpha.get_lock():
+        if value > shared_alpha.value:
+            shared_alpha.value = value
+    return [move, value, control.horizon, alpha]
+
+
+class RootSplitSearch(object):
+    # alpha-beta over a pool of worker processes that split the root moves: the first move of every iteration
+    # is searched alone to set alpha, then the other moves are searched at the same time, each worker starting
+    # from the best value found so far (shared alpha). iterative deepening orders the root moves of the next
+    # iteration by their values
+    def __init__(self, processes = None):
+        self.processes = processes or os.cpu_count()
+        self.alpha = Value('d', float("-inf"))
+        self.pool = Pool(self.processes, initializer = init_worker, initargs = (self.alpha,))
+        self.depth = 0  # the depth of the last iteration with a result
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def get_remaining_time(self, deadline):
+        if deadline is None:
+            return None
+        remaining = deadline - perf_counter()
+        if remaining <= 0:
+            raise SearchTimeout()
+        return remaining
+
+    def search(self, game, index, maximum_depth = float("inf"), time_limit = None, h_choice = 0, endgame_path = None,
+               evaluation = None):
+        # return the best move of the player with this index
+        deadline = None if time_limit is None else perf_counter() + time_limit
+        actions = game.get_actions(index)
+        self.depth = 0
+        if len(actions) == 1:
+            return actions[0]
+        best_move = actions[0]
+        depth = 1
+        while depth <= maximum_depth:
+            self.alpha.value = float("-inf")
+            try:
+                jobs = [[game.numPit, list(game.state), index, move, depth, self.get_remaining_time(deadline), h_choice,
+                         endgame_path, evaluation] for move in actions]
+                results = [self.pool.apply(search_move, [jobs[0]])]
+                if results[0][1] is not None:
+                    for job in jobs[1:]:
+                        job[5] = self.get_remaining_time(deadline)
+                    results += self.pool.map(search_move, jobs[1:], chunksize = 1)
+            except SearchTimeout:
+                break
+            if results[0][1] is None: # not even the first move was searched in time
+                break
+            searched = [[value, move] for move, value, horizon, alpha in results if value is not None]
+            # the first move is searched with alpha -inf, so at least one value is exact; a move that failed low
+            # is worth at most the alpha it was searched with, which an exact value already reached
+            exact = [[value, move] for move, value, horizon, alpha in results if value is not None and value > alpha]
+            best_move = max(exact, key = lambda result: result[0])[1]
+            self.depth = depth
+            if len(searched) < len(results): # the time ran out in this iteration
+                break
+            if sum(horizon for move, value, horizon, alpha in results) == 0: # the game tree is searched to its end
+                break
+            # the upper bounds only order the moves of the next iteration
+            values = {move: value for value, move in searched}
+            actions.sort(key = lambda move: (move != best_move, -values[move]))
+            depth += 1
+        return best_move
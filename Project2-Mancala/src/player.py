@@ -1,22 +1,49 @@
 from math import floor, ceil
 from random import choice
-from copy import deepcopy
+from multiprocessing import current_process
+from transposition import TranspositionTable, get_bound, is_cutoff
+from search_control import SearchControl, SearchTimeout
+from parallel_search import RootSplitSearch
 
 
 class Player(object):
-    def __init__(self, index, algorithm, maximum_depth = float("inf"), depth = 0):
+    def __init__(self, index, algorithm, maximum_depth = float("inf"), time_limit = None, h_choice = 0,
+                 endgame = None, book = None, evaluation = None):
        # Initialize a player 
        # index = 1 or 2 -> player1 or player2
-       # algorithm = 'random', 'human', 'minimax'or 'alphabeta'        
+       # algorithm = 'random', 'human', 'minimax', 'alphabeta' or 'parallel' (alphabeta on all the cores)
+       # maximum_depth = the number of moves to search ahead, every sowing counts as one
+       # time_limit = seconds per move of the alphabeta search, None to search to maximum_depth
+       # h_choice = the scoring of a finished game, see score()
+       # endgame = an EndgameDatabase the search looks positions with few stones up in, for h_choice 0 or 2
+       # book = an OpeningBook the searching players take their moves from before they search
+       # evaluation = the score of an unfinished game at the depth limit, e.g. a LinearEvaluation;
+       #              None for the store difference of score()
         self.index = index
         self.opp_index = 3 - self.index  # the index of the opponent, 1 or 2
         self.algorithm = algorithm
         self.maximum_depth = maximum_depth        
-        self.depth = depth
+        self.time_limit = time_limit
+        self.h_choice = h_choice
+        self.endgame = endgame if h_choice in (0, 2) else None # other scores depend on the length of the game
+        self.table = None  # the transposition table of the alphabeta search
+        self.use_table = h_choice in (0, 2) # other scores depend on the ply, which the table does not key on
+        self.control = None  # the time budget and move ordering of the alphabeta search
+        self.parallel = None  # the worker processes of the parallel search
+        self.book = book
+        self.evaluation = evaluation
 
     def reset(self):
         # reset the player
-        self.depth = 0
+        if self.table is not None:
+            self.table.clear()
+            self.control.clear()
+
+    def close(self):
+        # stop the worker processes of the parallel search
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
 
     def get_move(self, game):
         # get the move of the active player
@@ -24,9 +51,14 @@ class Player(object):
             'human': self.human_player,
             'random': self.random_player,
             'minimax': self.minimax_player,
-            'alphabeta': self.alphabeta_player
+            'alphabeta': self.alphabeta_player,
+            'parallel': self.parallel_player
         }
-        # call the function of human_player, random_player, minimax_player, alphabeta_player
+        if self.book is not None and self.algorithm in ('minimax', 'alphabeta', 'parallel'):
+            move = self.book.get_move(game, self.index)
+            if move is not None:
+                return move
+        # call the function of human_player, random_player, minimax_player, alphabeta_player, parallel_player
         return algos_dict[self.algorithm](game)
     
     def human_player(self, game):
@@ -45,16 +77,78 @@ class Player(object):
     
     def minimax_player(self, game):
         """minimax player"""
-        move = self.max_value(game)[1]
+        move = self.negamax(game, self.index, self.maximum_depth)[1]
         # print(f'\t minimax choice: {move}')
         return move
 
     def alphabeta_player(self, game):
         """alphabeta minimax player"""
-        move = self.max_value(game, True)[1]
+        self.init_search(game)
+        self.table.new_search()
+        move = self.iterative_deepening(game)
         # print(f'\t Alphabeta choice: {move}')
         return move
 
+    def parallel_player(self, game):
+        """alphabeta player splitting the root moves over worker processes"""
+        if current_process().daemon: # a worker process, e.g. of a tournament, cannot start its own workers
+            return self.alphabeta_player(game)
+        if self.parallel is None:
+            self.parallel = RootSplitSearch()
+        return self.parallel.search(game, self.index, self.maximum_depth, self.time_limit, self.h_choice,
+                                    self.endgame and self.endgame.path, self.evaluation)
+
+    def init_search(self, game):
+        """create the transposition table and the search control of the alphabeta search"""
+        if self.table is None:
+            self.table = TranspositionTable(pits = len(game.state), max_stones = sum(game.state))
+            self.control = SearchControl(game.numPit, self.time_limit)
+
+    def iterative_deepening(self, game):
+        """search one ply deeper at a time until the maximum depth or the time limit is reached"""
+        # every iteration starts with the principal variation of the previous one; when the time runs out,
+        # the best move of the last iteration is returned, or a better root move of the unfinished one
+        control = self.control
+        control.start()
+        state = list(game.state)
+        move = None
+        depth = 1
+        while depth <= self.maximum_depth:
+            control.start_iteration()
+            try:
+                move = self.negamax(game, self.index, depth, 0, True)[1]
+            except SearchTimeout:
+                game.state[:] = state  # the search stopped between a make_move and its unmake_move
+                if control.root_move is not None:
+                    move = control.root_move
+                break
+            control.depth = depth
+            if control.horizon == 0: # the game tree is searched to its end
+                break
+            control.pv = self.get_principal_variation(game, depth)
+            depth += 1
+        if move is None: # not even one ply was searched in time
+            move = game.filter_actions(self)[0]
+        return move
+
+    def get_principal_variation(self, game, depth):
+        """follow the best moves stored in the transposition table"""
+        pv = []
+        records = []
+        index = self.index
+        while len(pv) < depth and not game.check_end_game():
+            entry = self.table.probe(self.table.get_key(game.state, index))
+            if entry is None or entry[4] not in game.get_actions(index):
+                break
+            record = game.make_move(index, entry[4])
+            records.append((index, record))
+            pv.append(entry[4])
+            if not record[4]: # no extra turn
+                index = 3 - index
+        for index, record in reversed(records):
+            game.unmake_move(index, record)
+        return pv
+
     def ask_human_move(self, game):
         # for a humam player, enter an input move 
         request_str = ""  
@@ -84,88 +178,127 @@ class Player(object):
             move = int(input('\tWrong input. Please try again:'))            
         return move
 
-    def max_value(self, game, ab_flag = False, alpha = float("-inf"), beta = float("inf")):
-        """Find the max value of the move"""
-        if game.check_end_game() or self.reach_max_depth():
-            return self.score(game), None
-        
+    def negamax(self, game, index, depth, ply = 0, ab_flag = False, alpha = float("-inf"), beta = float("inf")):
+        """Find the value of the position for the player to move and its best move"""
+        # index = the player to move, depth = the moves left to search, ply = the moves made from the root.
+        # a move into the store is followed by another move of the same player with the same window;
+        # otherwise the opponent moves and the value and the window are negated
+        if game.check_end_game():
+            return self.score(game, self.h_choice, index, ply), None
+        if self.endgame is not None and ply > 0:
+            difference = self.endgame.get_value(game, index)
+            if difference is not None: # the game ends difference stones ahead with perfect play
+                return self.get_final_score(difference), None
+        if depth <= 0:
+            if ab_flag:
+                self.control.horizon += 1
+            if self.evaluation is not None:
+                return self.evaluation.evaluate(game, index), None
+            return self.score(game, self.h_choice, index, ply), None
+
+        control = self.control
+        actions = game.get_actions(index)
+        key = None
+        move = None
+        if ab_flag:
+            control.check_time()
+            # look the position up unless its children are leaves, which are cheaper to search than to hash
+            if depth > 1 and self.use_table:
+                key, value, move = self.probe_table(game, index, depth, alpha, beta)
+                if value is not None:
+                    return value, move
+            actions = control.order_moves(game, index, actions, ply, move)
+            alpha0 = alpha
+            horizon = control.horizon
         value = float("-inf")
         move = -1
-        for action in game.filter_actions(self):
-            opp_player = Player(self.opp_index, self.algorithm, self.maximum_depth, self.depth + 1)
-            next_game = deepcopy(game)
-            next_game.turn_taking(self, action)
-            value2, move2 = opp_player.min_value(next_game, ab_flag, alpha, beta)
+        for action in actions:
+            record = game.make_move(index, action)
+            if record[4]: # extra turn
+                value2 = self.negamax(game, index, depth - 1, ply + 1, ab_flag, alpha, beta)[0]
+            else:
+                value2 = -self.negamax(game, 3 - index, depth - 1, ply + 1, ab_flag, -beta, -alpha)[0]
+            game.unmake_move(index, record)
+            if ab_flag:
+                control.follow_pv = False # the first child ends the principal variation
             if value2 > value:
                 value = value2
                 move = action
-                alpha = max(alpha, value)                
+                if ab_flag:
+                    alpha = max(alpha, value)
+                    if ply == 0:
+                        control.root_move = action
             if ab_flag and value >= beta: # alpha-bate pruning
-                return value, move
+                control.add_cutoff(index, action, ply, depth)
+                break
+        if key is not None:
+            # a result that searched the game tree to its end holds for any depth
+            stored_depth = float("inf") if control.horizon == horizon else depth
+            self.table.store(key, stored_depth, value, get_bound(value, alpha0, beta), move)
         return value, move
 
-    def min_value(self, game, ab_flag = False, alpha = float("-inf"), beta = float("inf")):
-        """Find the min value of the move"""
-        if game.check_end_game() or self.reach_max_depth():
-            return self.score(game), None
-        
-        value = float("inf")
-        move = -1
-        for action in game.filter_actions(self):
-            opp_player = Player(self.opp_index, self.algorithm, self.maximum_depth, self.depth + 1)
-            next_game = deepcopy(game)
-            next_game.turn_taking(self, action)
-            value2, move2 = opp_player.max_value(next_game, ab_flag, alpha, beta)
-            if value2 < value:
-                value = value2
-                move = action
-                beta = min(beta, value)
-            if ab_flag and value <= alpha: # alpha-bate pruning
-                return value, move
-        return value, move
-    
-    def reach_max_depth(self):
-        """check whether it reaches the maximun depth"""
-        return self.depth >= self.maximum_depth
-    
-    def score(self, game, h_choice = 0):
+    def probe_table(self, game, index, depth, alpha, beta):
+        """look the position up in the transposition table"""
+        # return its key, and the stored value and move if they decide the window (alpha, beta);
+        # otherwise the value is None and the move is the stored best move to try first
+        key = self.table.get_key(game.state, index)
+        entry = self.table.probe(key)
+        if entry is None:
+            return key, None, None
+        stored_depth, value, bound, move = entry[1:5]
+        if stored_depth >= depth and is_cutoff(value, bound, alpha, beta):
+            if stored_depth != float("inf"):
+                self.control.horizon += 1 # the stored value was cut off by a depth limit as well
+            return key, value, move
+        return key, None, move
+
+    def get_final_score(self, difference):
+        """the score of a finished game that the player ends difference stones ahead"""
+        if self.h_choice == 2:
+            return difference
+        return 50 if difference > 0 else -50 if difference < 0 else 0
+
+    def score(self, game, h_choice = 0, index = None, depth = 0):
         """calculate the current score of self player"""
+        # or of the player with this index, depth moves into the search
+        index = index or self.index
+        opp_index = 3 - index
         win_index, p1_score, p2_score = game.find_winner_scores()
         if game.check_end_game():
             if h_choice == 0:
-                if win_index == self.index:
+                if win_index == index:
                     return 50
-                elif win_index == self.opp_index:
+                elif win_index == opp_index:
                     return -50
                 else:
                     return 0
             elif h_choice == 1:  # depth consider
-                if win_index == self.index:
-                    return 50 - self.depth
-                elif win_index == self.opp_index:
-                    return self.depth - 50
+                if win_index == index:
+                    return 50 - depth
+                elif win_index == opp_index:
+                    return depth - 50
                 else:
                     return 0
                 pass
             elif h_choice == 2:  # diff consider
-                if win_index == self.index:
+                if win_index == index:
                     return abs(p1_score - p2_score)
-                elif win_index == self.opp_index:
+                elif win_index == opp_index:
                     return -abs(p1_score - p2_score)
                 else:
                     return 0
             elif h_choice == 3:  # all consider
-                if win_index == self.index:
-                    return abs(p1_score - p2_score) - self.depth
-                elif win_index == self.opp_index:
-                    return -abs(p1_score - p2_score) + self.depth
+                if win_index == index:
+                    return abs(p1_score - p2_score) - depth
+                elif win_index == opp_index:
+                    return -abs(p1_score - p2_score) + depth
                 else:
                     return 0
             else:
                 pass
-        if win_index == self.index:
+        if win_index == index:
             return abs(p1_score - p2_score)
-        elif win_index == self.opp_index:
+        elif win_index == opp_index:
             return -abs(p1_score - p2_score)
         else:
             return 0
@@ -0,0 +1,87 @@
+from time import perf_counter
+
+
+class SearchTimeout(Exception):
+    # raised by the search when the time budget of the move runs out
+    pass
+
+
+class SearchControl(object):
+    # the time budget of a move and the move-ordering heuristics shared by all the nodes of a search:
+    # the principal variation of the previous iteration, the killer moves of each ply and
+    # the history score of each (player, pit), both filled by beta cutoffs
+    def __init__(self, numPit = 6, time_limit = None, max_ply = 128):
+        self.time_limit = time_limit  # seconds per move, None for no limit
+        self.deadline = None
+        self.killers = [[-1, -1] for _ in range(max_ply)]
+        self.history = [None, [0] * numPit, [0] * numPit]  # indexed by player.index
+        self.pv = []  # the moves of the principal variation by ply
+        self.follow_pv = False  # True while the search is still on the principal variation
+        self.horizon = 0  # the positions cut off by the depth limit in the current iteration
+        self.root_move = None  # the best root move found so far in the current iteration
+        self.depth = 0  # the depth of the last completed iteration
+
+    def start(self):
+        # start the search of a move: set the deadline, forget the killers and age the history scores
+        self.deadline = None if self.time_limit is None else perf_counter() + self.time_limit
+        for killers in self.killers:
+            killers[0] = killers[1] = -1
+        for history in self.history[1:]:
+            for pit in range(len(history)):
+                history[pit] //= 2
+        self.pv = []
+        self.depth = 0
+
+    def clear(self):
+        # forget the killers and the history scores
+        for killers in self.killers:
+            killers[0] = killers[1] = -1
+        for history in self.history[1:]:
+            history[:] = [0] * len(history)
+
+    def start_iteration(self):
+        self.follow_pv = True
+        self.horizon = 0
+        self.root_move = None
+
+    def check_time(self):
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def order_moves(self, game, index, actions, ply, best_move = None):
+        # order the actions: the move of the principal variation, the best move from the transposition
+        # table, moves ending in the store (the pit closest to the store first), captures by size,
+        # the killer moves of this ply, then the rest by history score
+        pv_move = None
+        if self.follow_pv:
+            if ply < len(self.pv) and self.pv[ply] in actions:
+                pv_move = self.pv[ply]
+            else:
+                self.follow_pv = False
+        if ply >= len(self.killers):
+            self.killers.append([-1, -1])
+        killers = self.killers[ply]
+        history = self.history[index]
+
+        def get_priority(action):
+            if action == pv_move:
+                return 0, 0
+            if action == best_move:
+                return 1, 0
+            if game.is_extra_turn(index, action):
+                return 2, -action
+            captured = game.get_capture(index, action)
+            if captured:
+                return 3, -captured
+            if action in killers:
+                return 4, killers.index(action)
+            return 5, -history[action]
+        return sorted(actions, key = get_priority)
+
+    def add_cutoff(self, index, move, ply, depth):
+        # record a move that caused a beta cutoff with depth plies left to search
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[index][move] += depth * depth
@@ -0,0 +1,221 @@
+import os
+import csv
+import math
+import random
+import argparse
+from time import perf_counter
+from multiprocessing import Pool
+from mancala import Mancala
+from player import Player
+from endgame import ENDGAME_PATH, load_endgame_database
+from opening_book import BOOK_PATH, load_opening_book
+from evaluation import load_evaluation
+
+
+TOURNAMENT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tournaments')
+TABLE_HEADER = ['player', 'games', 'wins', 'draws', 'losses', 'score', 'moves',
+                'mean_ms', 'median_ms', 'p95_ms', 'max_ms']
+PAIRS_HEADER = ['player1', 'player2', 'games', 'player1_wins', 'draws', 'player2_wins']
+
+
+# ## Configurations
+
+# parse 'algorithm[:depth[:h_choice[:seconds[:weights file]]]]' into
+# [algorithm, maximum depth, h_choice, time limit, weights file of a LinearEvaluation]
+def parse_configuration(spec):
+    fields = spec.split(':')
+    depth = float(fields[1]) if len(fields) > 1 and fields[1] else 6
+    h_choice = int(fields[2]) if len(fields) > 2 and fields[2] else 0
+    time_limit = float(fields[3]) if len(fields) > 3 and fields[3] else None
+    weights_path = fields[4] if len(fields) > 4 and fields[4] else None
+    return [fields[0], int(depth) if depth != float("inf") else depth, h_choice, time_limit, weights_path]
+
+
+def get_configuration_name(configuration):
+    algorithm, depth, h_choice, time_limit, weights_path = configuration
+    name = algorithm + ':' + str(depth) + ':' + str(h_choice)
+    if time_limit is not None or weights_path is not None:
+        name += ':' + ('' if time_limit is None else str(time_limit))
+    return name if weights_path is None else name + ':' + os.path.basename(weights_path)
+
+
+# play every pair of configurations `games` times with each of them as player1; every game gets its own seed
+# from `seed`, which drives the random players and the `opening` random moves played before the bots take over.
+# return [game number, configuration of player1, configuration of player2, seed, opening] jobs
+def get_games(configurations, games, seed = 0, opening = 0):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(len(configurations)):
+        for j in range(i + 1, len(configurations)):
+            for game in range(games):
+                game_seed = rng.getrandbits(32)
+                # the same opening with the sides swapped
+                for configuration1, configuration2 in ((configurations[i], configurations[j]),
+                                                       (configurations[j], configurations[i])):
+                    jobs.append([len(jobs), configuration1, configuration2, game_seed, opening])
+    return jobs
+
+
+# ## Workers
+
+# every worker process keeps one board, one player per (side, configuration), the endgame database and
+# the opening book for all its games
+worker_game = None
+worker_players = {}
+worker_endgame = None
+worker_book = None
+
+
+def init_worker(endgame_path = None, book_path = None):
+    global worker_game, worker_endgame, worker_book
+    worker_game = Mancala()
+    worker_players.clear()
+    worker_endgame = load_endgame_database(endgame_path)
+    worker_book = load_opening_book(book_path)
+
+
+def get_player(index, configuration):
+    key = (index, tuple(configuration))
+    if key not in worker_players:
+        algorithm, depth, h_choice, time_limit, weights_path = configuration
+        worker_players[key] = Player(index, algorithm, depth, time_limit, h_choice, worker_endgame, worker_book,
+                                     load_evaluation(weights_path))
+    player = worker_players[key]
+    player.reset()
+    return player
+
+
+# play the random opening moves of a game; the player who moves next is left in game.ready_player
+def play_opening(game, opening):
+    index = 1
+    for ply in range(opening):
+        if game.check_end_game():
+            break
+        if not game.make_move(index, random.choice(game.get_actions(index)))[4]:
+            index = 3 - index
+    game.ready_player = index
+
+
+# play one game; return [game number, winner, player1 store, player2 store, player1 move times, player2 move times]
+def play_game(job):
+    number, configuration1, configuration2, seed, opening = job
+    if worker_game is None:
+        init_worker()
+    random.seed(seed)
+    worker_game.reset()
+    play_opening(worker_game, opening)
+    player1 = get_player(1, configuration1)
+    player2 = get_player(2, configuration2)
+    move_times = {1: [], 2: []}
+    winner = worker_game.play_game(player1, player2, False, move_times)
+    return [number, winner, worker_game.p1_store(), worker_game.p2_store(), move_times[1], move_times[2]]
+
+
+# play the games on `processes` worker processes (all the cores by default);
+# return the results in the order of the jobs
+def run_tournament(jobs, processes = None, callback = None, endgame_path = None, book_path = None):
+    results = [None] * len(jobs)
+    with Pool(processes or os.cpu_count(), initializer = init_worker, initargs = (endgame_path, book_path)) as pool:
+        for result in pool.imap_unordered(play_game, jobs):
+            results[result[0]] = result
+            if callback:
+                callback(jobs[result[0]], result)
+    return results
+
+
+# ## Results
+
+def get_latency(times):
+    # mean, median, 95th percentile and maximum of the move times in milliseconds
+    if not times:
+        return [None] * 4
+    times = sorted(times)
+    return [round(1000 * sum(times) / len(times), 3), round(1000 * times[len(times) // 2], 3),
+            round(1000 * times[max(0, math.ceil(0.95 * len(times)) - 1)], 3), round(1000 * times[-1], 3)]
+
+
+# summarize the games into one row per configuration in the order of TABLE_HEADER, best score first,
+# and one row per pairing in the order of PAIRS_HEADER
+def get_tables(jobs, results):
+    players = {}
+    pairs = {}
+    for [number, configuration1, configuration2, seed, opening], result in zip(jobs, results):
+        winner, times = result[1], [None, result[4], result[5]]
+        names = [None, get_configuration_name(configuration1), get_configuration_name(configuration2)]
+        for index in (1, 2):
+            record = players.setdefault(names[index], [0, 0, 0, []])  # wins, draws, losses, move times
+            record[[1, 0, 2][winner] if index == 1 else [1, 2, 0][winner]] += 1
+            record[3] += times[index]
+        pairs.setdefault((names[1], names[2]), [0, 0, 0])[[1, 0, 2][winner]] += 1
+
+    table = []
+    for name, [wins, draws, losses, times] in players.items():
+        games = wins + draws + losses
+        table.append([name, games, wins, draws, losses, round((wins + draws / 2) / games, 3), len(times)] +
+                     get_latency(times))
+    table.sort(key = lambda row: -row[5])
+    pairs_table = [[name1, name2, sum(record), record[0], record[1], record[2]]
+                   for (name1, name2), record in pairs.items()]
+    return table, pairs_table
+
+
+def write_table(path, header, table):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(table)
+
+
+if __name__ == '__main__':
+    # > python tournament.py minimax:6 alphabeta:8 alphabeta:6:0:0.1 --games 50 --opening 2
+    parser = argparse.ArgumentParser(description = 'Play a round-robin tournament between Mancala players')
+    parser.add_argument("players",
+                        nargs = '+',
+                        help = "algorithm[:depth[:h_choice[:seconds per move[:weights file]]]] of each player")
+    parser.add_argument("--games",
+                        type = int,
+                        help = "games of every pairing with each player as player1",
+                        default = 10)
+    parser.add_argument("--opening",
+                        type = int,
+                        help = "random moves played before the players take over, so that the games differ",
+                        default = 2)
+    parser.add_argument("--seed",
+                        type = int,
+                        help = "seed of the games",
+                        default = 0)
+    parser.add_argument("--processes",
+                        type = int,
+                        help = "worker processes, all the cores by default",
+                        default = None)
+    parser.add_argument("--endgame",
+                        type = str,
+                        nargs = '?',
+                        help = "endgame database the searches look positions with few stones up in",
+                        const = ENDGAME_PATH,
+                        default = None)
+    parser.add_argument("--book",
+                        type = str,
+                        nargs = '?',
+                        help = "opening book the searching players take their first moves from",
+                        const = BOOK_PATH,
+                        default = None)
+    args = parser.parse_args()
+
+    configurations = [parse_configuration(spec) for spec in args.players]
+    jobs = get_games(configurations, args.games, args.seed, args.opening)
+    print('Playing ' + str(len(jobs)) + ' games')
+    starting_time = perf_counter()
+    results = run_tournament(jobs, args.processes, endgame_path = args.endgame, book_path = args.book)
+    print(f"time consuming: {perf_counter() - starting_time:.2f}")
+
+    table, pairs_table = get_tables(jobs, results)
+    if not os.path.exists(TOURNAMENT_DIRECTORY):
+        os.makedirs(TOURNAMENT_DIRECTORY)
+    name = 'tournament_n' + str(args.games) + '_o' + str(args.opening) + '_s' + str(args.seed)
+    write_table(os.path.join(TOURNAMENT_DIRECTORY, name + '.csv'), TABLE_HEADER, table)
+    write_table(os.path.join(TOURNAMENT_DIRECTORY, name + '_pairs.csv'), PAIRS_HEADER, pairs_table)
+    for header, rows in ((TABLE_HEADER, table), (PAIRS_HEADER, pairs_table)):
+        print(' '.join(f"{column:>16}" for column in header))
+        for row in rows:
+            print(' '.join(f"{str(value):>16}" for value in row))
@@ -0,0 +1,77 @@
+from random import Random
+
+
+# bound types of a stored value
+EXACT = 0  # the value of the position
+LOWER = 1  # the search failed high, the value of the position is at least this value
+UPPER = 2  # the search failed low, the value of the position is at most this value
+
+
+class Zobrist(object):
+    # Zobrist hashing of a Mancala state: one random 64-bit key for each (pit, number of stones)
+    # and one for each side to move, XORed together
+    def __init__(self, pits = 14, max_stones = 48, seed = 442):
+        rng = Random(seed)
+        self.pit_keys = [[rng.getrandbits(64) for _ in range(max_stones + 1)] for _ in range(pits)]
+        self.side_keys = [0, rng.getrandbits(64), rng.getrandbits(64)]  # indexed by player.index
+
+    def get_key(self, state, index):
+        # get the key of a state with the player of this index to move
+        key = self.side_keys[index]
+        for pit_keys, stones in zip(self.pit_keys, state):
+            key ^= pit_keys[stones]
+        return key
+
+
+class TranspositionTable(object):
+    # a fixed number of slots indexed by the low bits of the key, each holding
+    # (key, depth, value, bound, best move, generation). a slot is replaced by a result from a newer
+    # search (generation) or by one searched at least as deep (depth-preferred with aging)
+    def __init__(self, size = 2 ** 18, pits = 14, max_stones = 48):
+        self.size = 1 << (size - 1).bit_length()  # round up to a power of 2
+        self.mask = self.size - 1
+        self.slots = [None] * self.size
+        self.zobrist = Zobrist(pits, max_stones)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def get_key(self, state, index):
+        return self.zobrist.get_key(state, index)
+
+    def new_search(self):
+        # start the search of a new move so older entries can be replaced
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def probe(self, key):
+        # get the entry of the key, or None if its slot holds another position
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, value, bound, move):
+        slot = key & self.mask
+        entry = self.slots[slot]
+        if entry is None or entry[5] != self.generation or depth >= entry[1]:
+            self.slots[slot] = (key, depth, value, bound, move, self.generation)
+
+
+# get the bound type of a fail-soft alpha-beta value searched with the window (alpha, beta)
+def get_bound(value, alpha, beta):
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+
+# check whether a stored (value, bound) decides the window (alpha, beta)
+def is_cutoff(value, bound, alpha, beta):
+    return bound == EXACT or (bound == LOWER and value >= beta) or (bound == UPPER and value <= alpha)
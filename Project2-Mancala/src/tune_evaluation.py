@@ -0,0 +1,164 @@
+import os
+import random
+import argparse
+import numpy as np
+from time import perf_counter
+from multiprocessing import Pool
+from mancala import Mancala
+from player import Player
+from evaluation import FEATURES, STORE_WEIGHTS, WEIGHTS_PATH, LinearEvaluation
+
+
+# ## Self-play
+
+# play one game between two alphabeta players with the same evaluation; with probability epsilon a move is random
+# so that the games differ. return the positions before every move as [state + [player to move]] rows and the
+# final store difference of player1
+def play_training_game(job):
+    seed, weights, depth, opening, epsilon, numPit = job
+    random.seed(seed)
+    game = Mancala(numPit)
+    evaluation = LinearEvaluation(weights)
+    players = [None] + [Player(index, 'alphabeta', depth, evaluation = evaluation) for index in (1, 2)]
+    positions = []
+    index = 1
+    ply = 0
+    while not game.check_end_game():
+        if ply < opening or random.random() < epsilon:
+            move = random.choice(game.get_actions(index))
+        else:
+            positions.append(game.state + [index])
+            move = players[index].get_move(game)
+        if not game.make_move(index, move)[4]:
+            index = 3 - index
+        ply += 1
+    return positions, game.p1_store() - game.p2_store()
+
+
+# get the width of a position row: the pits and stores of both players, then the player to move
+def get_position_width(numPit = 6):
+    return 2 * numPit + 3
+
+
+# play the games on `processes` worker processes; return the positions as an (n, get_position_width(numPit))
+# array and the final store difference of the player to move of each position
+def play_training_games(games, weights, depth, opening = 2, epsilon = 0.1, seed = 0, processes = None, numPit = 6):
+    rng = random.Random(seed)
+    jobs = [[rng.getrandbits(32), list(weights), depth, opening, epsilon, numPit] for _ in range(games)]
+    rows = []
+    targets = []
+    with Pool(processes or os.cpu_count()) as pool:
+        for positions, difference in pool.imap_unordered(play_training_game, jobs):
+            for position in positions:
+                rows.append(position)
+                targets.append(difference if position[-1] == 1 else -difference)
+    return (np.array(rows, dtype = np.int64).reshape(-1, get_position_width(numPit)),
+            np.array(targets, dtype = np.float64))
+
+
+# ## Features
+
+# get the features of one side for many positions at once, in the order of FEATURES;
+# pits and opp_pits are (n, numPit) arrays, store is (n,)
+def get_side_features(pits, store, opp_pits):
+    n, numPit = pits.shape
+    cycle = 2 * numPit + 1
+    sown = pits > 0
+    last_pit = (np.arange(numPit) + pits) % cycle
+    on_side = last_pit < numPit
+    landing = np.minimum(last_pit, numPit - 1)
+    empty = np.take_along_axis(pits, landing, axis = 1) == 0
+    opposite = np.take_along_axis(opp_pits, numPit - 1 - landing, axis = 1)
+    captures = np.where(sown & (pits < cycle) & on_side & empty, 1 + opposite, 0)
+    return np.stack([store, pits.sum(axis = 1), captures.max(axis = 1),
+                     (sown & (last_pit == numPit)).sum(axis = 1), sown.sum(axis = 1)], axis = 1)
+
+
+# get the features of many positions, (n, 2 * numPit + 3) arrays of the state and the player to move,
+# as an (n, len(FEATURES)) array; the batch version of evaluation.get_features
+def get_feature_matrix(positions, numPit = 6):
+    states = positions[:, :-1]
+    # the player to move first
+    states = np.where((positions[:, -1] == 1)[:, None], states, np.roll(states, numPit + 1, axis = 1))
+    own_pits, own_store = states[:, :numPit], states[:, numPit]
+    opp_pits, opp_store = states[:, numPit + 1:-1], states[:, -1]
+    return get_side_features(own_pits, own_store, opp_pits) - get_side_features(opp_pits, opp_store, own_pits)
+
+
+# fit the weights that predict the final store difference from the features by ridge regression
+def fit_weights(features, targets, ridge = 1.0):
+    features = features.astype(np.float64)
+    gram = features.T @ features + ridge * np.eye(features.shape[1])
+    return np.linalg.solve(gram, features.T @ targets)
+
+
+# play `generations` rounds of self-play, each with the weights fitted on the positions of all the rounds so far;
+# return the weights and the mean squared error of the last fit
+def tune(generations = 3, games = 200, depth = 2, opening = 2, epsilon = 0.1, seed = 0, ridge = 1.0,
+         processes = None, weights = STORE_WEIGHTS, numPit = 6):
+    positions = np.zeros((0, get_position_width(numPit)), dtype = np.int64)
+    targets = np.zeros(0)
+    error = None
+    for generation in range(generations):
+        new_positions, new_targets = play_training_games(games, weights, depth, opening, epsilon,
+                                                         seed + generation, processes, numPit)
+        positions = np.concatenate([positions, new_positions])
+        targets = np.concatenate([targets, new_targets])
+        features = get_feature_matrix(positions, numPit)
+        weights = [round(float(weight), 4) for weight in fit_weights(features, targets, ridge)]
+        error = float(np.mean((features @ np.array(weights) - targets) ** 2))
+        print(f"generation {generation}: {len(positions)} positions, mean squared error {error:.3f}, weights " +
+              ', '.join(f"{feature} {weight}" for feature, weight in zip(FEATURES, weights)))
+    return weights, error
+
+
+if __name__ == '__main__':
+    # > python tune_evaluation.py --generations 3 --games 200 --depth 2
+    parser = argparse.ArgumentParser(description = 'Fit the weights of the Mancala evaluation by self-play')
+    parser.add_argument("--generations",
+                        type = int,
+                        help = "rounds of self-play, each with the weights of the previous round",
+                        default = 3)
+    parser.add_argument("--games",
+                        type = int,
+                        help = "games of every round",
+                        default = 200)
+    parser.add_argument("--depth",
+                        type = int,
+                        help = "maximum depth of the self-play players",
+                        default = 2)
+    parser.add_argument("--opening",
+                        type = int,
+                        help = "random moves at the start of every game",
+                        default = 2)
+    parser.add_argument("--epsilon",
+                        type = float,
+                        help = "probability of a random move afterwards",
+                        default = 0.1)
+    parser.add_argument("--ridge",
+                        type = float,
+                        help = "ridge penalty of the fit",
+                        default = 1.0)
+    parser.add_argument("--seed",
+                        type = int,
+                        help = "seed of the games",
+                        default = 0)
+    parser.add_argument("--pits",
+                        type = int,
+                        help = "pits on each side",
+                        default = 6)
+    parser.add_argument("--processes",
+                        type = int,
+                        help = "worker processes, all the cores by default",
+                        default = None)
+    parser.add_argument("--output",
+                        type = str,
+                        help = "path of the weights",
+                        default = WEIGHTS_PATH)
+    args = parser.parse_args()
+
+    starting_time = perf_counter()
+    weights, error = tune(args.generations, args.games, args.depth, args.opening, args.epsilon, args.seed,
+                          args.ridge, args.processes, numPit = args.pits)
+    LinearEvaluation(weights).save(args.output)
+    print(f"weights written to {args.output} in {perf_counter() - starting_time:.2f}s")